@@ -0,0 +1,11 @@
+-- De shortlist sorteert op eiwitdichtheid (protein / kcal) over alles met
+-- kcal > 0. Zonder index betekent dat elke keer de hele tabel door een tijdelijke
+-- sorteerboom; met deze partiële index loopt SQLite de index af en stopt na de
+-- gevraagde LIMIT. De WHERE moet letterlijk gelijk blijven aan die in de query,
+-- anders mag de planner de index niet gebruiken.
+--
+-- Toepassen:
+--   npx wrangler d1 execute ah-macro-planner --local  --file=./migrations/0007_recipe_density_index.sql
+--   npx wrangler d1 execute ah-macro-planner --remote --file=./migrations/0007_recipe_density_index.sql
+CREATE INDEX IF NOT EXISTS idx_recipe_nutrition_density
+  ON recipe_nutrition(protein / kcal DESC) WHERE kcal > 0;
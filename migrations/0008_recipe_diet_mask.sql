@@ -0,0 +1,28 @@
+-- Het dieetfilter van de planner zocht per verboden label met LIKE in de
+-- tags-JSON van elk recept. Nu staat er per recept een bitmasker naast, en is
+-- het hele dieet één `(diet_mask & ?) = 0`. De bits zijn DIET_BITS uit
+-- src/nutrition/diet.ts; die twee moeten gelijk blijven.
+--
+-- Toepassen:
+--   npx wrangler d1 execute ah-macro-planner --local  --file=./migrations/0008_recipe_diet_mask.sql
+--   npx wrangler d1 execute ah-macro-planner --remote --file=./migrations/0008_recipe_diet_mask.sql
+--
+-- De ALTER is niet idempotent in SQLite; "duplicate column name" bij een tweede
+-- run betekent simpelweg dat deze migratie al gedraaid heeft.
+ALTER TABLE recipes ADD COLUMN diet_mask INTEGER NOT NULL DEFAULT 0;
+
+-- Bestaande recepten krijgen hun masker uit de labels die er al staan. Elk
+-- label komt per recept één keer voor, dus de som van de bits is hun OR.
+UPDATE recipes SET diet_mask = COALESCE((
+  SELECT SUM(CASE t.value
+    WHEN 'varken' THEN 1
+    WHEN 'vlees'  THEN 2
+    WHEN 'vis'    THEN 4
+    WHEN 'zuivel' THEN 8
+    WHEN 'ei'     THEN 16
+    WHEN 'noten'  THEN 32
+    WHEN 'gluten' THEN 64
+    ELSE 0
+  END)
+  FROM json_each(COALESCE(recipes.tags, '[]')) t
+), 0);
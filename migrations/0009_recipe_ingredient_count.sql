@@ -0,0 +1,14 @@
+-- Het receptenoverzicht en de opruiming van onvolledige recepten telden de
+-- ingredienten met json_array_length over de volledige ingredienten-JSON van
+-- elke rij. Dat getal staat nu als kolom naast het recept; putRecipe houdt hem
+-- bij volgens dezelfde regel als de ingredienten zelf.
+--
+-- Toepassen:
+--   npx wrangler d1 execute ah-macro-planner --local  --file=./migrations/0009_recipe_ingredient_count.sql
+--   npx wrangler d1 execute ah-macro-planner --remote --file=./migrations/0009_recipe_ingredient_count.sql
+--
+-- De ALTER is niet idempotent in SQLite; "duplicate column name" bij een tweede
+-- run betekent simpelweg dat deze migratie al gedraaid heeft.
+ALTER TABLE recipes ADD COLUMN ingredient_count INTEGER NOT NULL DEFAULT 0;
+
+UPDATE recipes SET ingredient_count = COALESCE(json_array_length(ingredients), 0);
@@ -0,0 +1,10 @@
+-- Het productoverzicht telt per product de koppelingen en zet hun namen op een
+-- rij, met twee subqueries op ingredient_matches.webshop_id. Zonder index is dat
+-- per getoond product een volledige scan van alle koppelingen, en omdat er op
+-- dat aantal gesorteerd wordt, voor élk product. Met de naam in de index hoeven
+-- beide subqueries de tabel zelf niet te lezen.
+--
+-- Toepassen:
+--   npx wrangler d1 execute ah-macro-planner --local  --file=./migrations/0010_match_product_index.sql
+--   npx wrangler d1 execute ah-macro-planner --remote --file=./migrations/0010_match_product_index.sql
+CREATE INDEX IF NOT EXISTS idx_ingredient_matches_product ON ingredient_matches(webshop_id, ingredient_name);
@@ -24,7 +24,13 @@ CREATE TABLE IF NOT EXISTS recipes (
   -- De voedingswaarde per portie zoals AH die zelf op de receptpagina zet, JSON.
   -- Hiermee worden de ingredienten gevuld waar geen product bij te vinden was;
   -- zie fillFromRecipeTotal in src/nutrition/resolve.ts.
-  nutrition_per_serving TEXT
+  nutrition_per_serving TEXT,
+  -- De inhoudslabels uit tags als bitmasker (DIET_BITS in src/nutrition/diet.ts),
+  -- zodat het dieetfilter één bitvergelijking is in plaats van een LIKE per label.
+  diet_mask    INTEGER NOT NULL DEFAULT 0,
+  -- json_array_length(ingredients), bij het opslaan berekend: het overzicht en
+  -- de opruiming hoeven de ingredienten-JSON dan niet te lezen om hem te tellen.
+  ingredient_count INTEGER NOT NULL DEFAULT 0
 );
 
 CREATE TABLE IF NOT EXISTS products (
@@ -45,6 +51,11 @@ CREATE TABLE IF NOT EXISTS ingredient_matches (
   matched_at       INTEGER NOT NULL
 );
 
+-- De omgekeerde kant: welke namen aan een product hangen. Het productoverzicht
+-- telt en noemt die per product; met de naam erin is de index dekkend en hoeft
+-- de tabel zelf niet gelezen te worden.
+CREATE INDEX IF NOT EXISTS idx_ingredient_matches_product ON ingredient_matches(webshop_id, ingredient_name);
+
 -- Cached per-recipe nutrition totals, used to shortlist recipes before solving.
 CREATE TABLE IF NOT EXISTS recipe_nutrition (
   recipe_id   TEXT PRIMARY KEY REFERENCES recipes(id) ON DELETE CASCADE,
@@ -64,6 +75,10 @@ CREATE TABLE IF NOT EXISTS recipe_nutrition (
 
 CREATE INDEX IF NOT EXISTS idx_recipe_nutrition_protein ON recipe_nutrition(protein);
 CREATE INDEX IF NOT EXISTS idx_recipe_nutrition_kcal ON recipe_nutrition(kcal);
+-- Partiële index in precies de volgorde van shortlist(): de planner loopt hem
+-- af en stopt na LIMIT rijen, in plaats van alles met kcal > 0 te sorteren.
+CREATE INDEX IF NOT EXISTS idx_recipe_nutrition_density
+  ON recipe_nutrition(protein / kcal DESC) WHERE kcal > 0;
 CREATE INDEX IF NOT EXISTS idx_recipes_fetched ON recipes(fetched_at);
 
 -- ---------------------------------------------------------------- scrape-archief
@@ -24,7 +24,8 @@ export function findLocalDb(rootDir: string): string | null;
 
 /**
  * Opent de lokale D1-database en geeft er een Store op terug (busy_timeout
- * 5000). Sluiten kan met `store.db.close()`.
+ * 5000). Sluiten kan met `store.db.close()`; `store.db.checkpoint()` schrijft
+ * het WAL-bestand tussendoor terug.
  */
 export function openStore(dbPath: string): Store;
 
@@ -46,9 +47,14 @@ export function parseSearchResults(body: unknown): ProductSuggestion[];
 
 /**
  * De niet-vrije ingrediënten van een recept die nog geen productkoppeling
- * hebben; leeg betekent: niets te verrijken.
+ * hebben; leeg betekent: niets te verrijken. `linked` is de uitkomst van
+ * `store.linkedIngredientNames()`; dan wordt er niets opgevraagd.
  */
-export function openIngredientNames(store: Store, recipe: Recipe): Promise<string[]>;
+export function openIngredientNames(
+  store: Store,
+  recipe: Recipe,
+  linked?: ReadonlySet<string>,
+): Promise<string[]>;
 
 /**
  * Of een recept een klaar-markering heeft: een eerdere verrijkingspoging
@@ -56,6 +62,9 @@ export function openIngredientNames(store: Store, recipe: Recipe): Promise<strin
  */
 export function isRecipeDone(store: Store, recipeId: string): Promise<boolean>;
 
+/** De ids van alle recepten met een klaar-markering, met één query. */
+export function doneRecipeIds(store: Store): Promise<Set<string>>;
+
 /** Zet de klaar-markering; zie isRecipeDone. */
 export function markRecipeDone(store: Store, recipeId: string): Promise<void>;
 
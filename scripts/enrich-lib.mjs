@@ -75,7 +75,8 @@ const BODY_IN = join(WORK_DIR, "body.json");
 const BODY_OUT = join(WORK_DIR, "body-out.json");
 
 const CURL_TIMEOUT_MS = 20_000;
-// Rust tussen verzoeken aan ah.nl; Akamai reageert op tempo.
+// Minimale tijd tussen het begin van twee verzoeken aan ah.nl; Akamai reageert
+// op tempo.
 const PACE_MS = 1100;
 // Wachten na een 403/429 voordat we het opnieuw proberen (max 2 pogingen).
 const RETRY_MS = 4000;
@@ -135,31 +136,39 @@ export function findLocalDb(rootDir) {
 // prepare/bind/first/all/run + batch/exec, zodat de echte Store-klasse er
 // zonder wijzigingen op draait. De dev-server kan dezelfde database open
 // hebben; busy_timeout zorgt dat we netjes wachten op een lock.
+//
+// `compile` geeft per SQL-tekst steeds hetzelfde gecompileerde statement terug:
+// de watcher draait dezelfde handvol queries honderden keren per ronde, en
+// opnieuw compileren kostte meer dan de query zelf.
 class LocalStatement {
-  constructor(db, sql, params = []) {
-    this.db = db;
+  constructor(compile, sql, params = []) {
+    this.compile = compile;
     this.sql = sql;
     this.params = params;
   }
 
   bind(...params) {
-    return new LocalStatement(this.db, this.sql, params.map(normalise));
+    return new LocalStatement(this.compile, this.sql, params.map(normalise));
   }
 
+  // Rijen gaan ongekopieerd door. node:sqlite leest gehele getallen standaard
+  // als number (readBigInts staat uit), en het null-prototype van de rij-
+  // objecten maakt voor de Store niet uit: die leest alleen velden uit. Een
+  // kopie per rij kostte bij de volle receptenlijst van de watcher meer dan
+  // de query zelf.
   async first(column) {
-    const row = this.db.prepare(this.sql).get(...this.params);
+    const row = this.compile(this.sql).get(...this.params);
     if (row === undefined) return null;
-    const clean = plainify(row);
-    return column ? (clean[column] ?? null) : clean;
+    return column ? (row[column] ?? null) : row;
   }
 
   async all() {
-    const rows = this.db.prepare(this.sql).all(...this.params);
-    return { results: rows.map(plainify), success: true, meta: {} };
+    const rows = this.compile(this.sql).all(...this.params);
+    return { results: rows, success: true, meta: {} };
   }
 
   async run() {
-    const info = this.db.prepare(this.sql).run(...this.params);
+    const info = this.compile(this.sql).run(...this.params);
     return {
       success: true,
       meta: { changes: Number(info.changes), last_row_id: Number(info.lastInsertRowid) },
@@ -174,36 +183,78 @@ function normalise(value) {
   return value;
 }
 
-/** node:sqlite geeft null-prototype objecten en BigInts terug; maak ze gewoon. */
-function plainify(row) {
-  const out = {};
-  for (const [key, value] of Object.entries(row)) {
-    out[key] = typeof value === "bigint" ? Number(value) : value;
-  }
-  return out;
-}
-
 /**
  * Opent de lokale D1-database en geeft er een Store op terug (busy_timeout
  * 5000). De dev-server mag dezelfde database gewoon open hebben; een lock
  * waarop we langer dan die 5 seconden moeten wachten gooit. Sluiten kan met
  * `store.db.close()` — de adapter hangt onder dezelfde sleutel aan de Store.
+ * `store.db.checkpoint()` schrijft het WAL-bestand tussendoor terug.
  */
 export function openStore(dbPath) {
   const db = new DatabaseSync(dbPath);
-  db.exec("PRAGMA busy_timeout=5000");
+  // synchronous, temp_store, cache_size en mmap_size gelden alleen voor deze
+  // verbinding; de journal-modus en page_size laten we aan de dev-server, die
+  // het bestand aanmaakt en beheert. Met mmap leest een scan over recepten en
+  // producten de pagina's rechtstreeks uit het bestand in plaats van via read().
+  db.exec(
+    "PRAGMA busy_timeout=5000; PRAGMA synchronous=NORMAL; PRAGMA temp_store=MEMORY; " +
+      "PRAGMA cache_size=-65536; PRAGMA mmap_size=268435456",
+  );
+  const compiled = new Map();
+  const compile = (sql) => {
+    let statement = compiled.get(sql);
+    if (!statement) {
+      statement = db.prepare(sql);
+      compiled.set(sql, statement);
+    }
+    return statement;
+  };
   return new Store({
-    prepare: (sql) => new LocalStatement(db, sql),
+    prepare: (sql) => new LocalStatement(compile, sql),
+    // Zoals D1: een batch is één transactie, dus één commit (en één fsync)
+    // voor de hele reeks in plaats van één per rij. IMMEDIATE pakt het
+    // schrijfslot meteen: dan wacht busy_timeout netjes als de dev-server aan
+    // het schrijven is. Een gewone BEGIN begint als lezer, en het ophogen naar
+    // schrijver halverwege faalt in WAL-modus direct met SQLITE_BUSY als er
+    // intussen iemand anders geschreven heeft — daar helpt geen busy_timeout.
     async batch(statements) {
       const out = [];
-      for (const statement of statements) out.push(await statement.run());
+      db.exec("BEGIN IMMEDIATE");
+      try {
+        for (const statement of statements) out.push(await statement.run());
+        db.exec("COMMIT");
+      } catch (err) {
+        db.exec("ROLLBACK");
+        throw err;
+      }
       return out;
     },
     async exec(sql) {
       db.exec(sql);
       return { count: 0, duration: 0 };
     },
-    close: () => db.close(),
+    // In WAL-modus groeit het -wal-bestand zolang niemand het terugschrijft,
+    // en elke lezer moet er de nieuwste versie van een pagina in opzoeken.
+    // PASSIVE schrijft terug wat kan zonder op iemand te wachten, dus de
+    // dev-server merkt er niets van; TRUNCATE bij het sluiten wacht (binnen
+    // busy_timeout) op lezers en zet het bestand daarna op nul. Zonder WAL
+    // doet het pragma niets, en lukt het niet dan is dat geen fout: dan
+    // checkpoint SQLite later zelf.
+    checkpoint: (mode = "PASSIVE") => {
+      try {
+        db.exec(`PRAGMA wal_checkpoint(${mode})`);
+      } catch {
+        // bezet; de volgende keer weer
+      }
+    },
+    close: () => {
+      try {
+        db.exec("PRAGMA wal_checkpoint(TRUNCATE)");
+      } catch {
+        // bezet; sluiten gaat voor
+      }
+      db.close();
+    },
   });
 }
 
@@ -225,11 +276,19 @@ function curl(args) {
   return res.stdout ?? "";
 }
 
-/** Eén curl-aanroep mét het verplichte rustmoment erna (Akamai-tempo). */
+let lastCurlAt = 0;
+
+/**
+ * Eén curl-aanroep op Akamai-tempo. Zoals sharedPace in de Worker telt de
+ * tussenpoos vanaf het begin van het vorige verzoek: elke curl.exe bouwt een
+ * eigen TLS-verbinding op, en pas daarna PACE_MS slapen telde die opbouw en
+ * de overdracht dubbel, zonder dat het tempo bij ah.nl daar iets aan had.
+ */
 async function pacedCurl(args) {
-  const out = curl(args);
-  await sleep(PACE_MS);
-  return out;
+  const wait = PACE_MS - (Date.now() - lastCurlAt);
+  if (wait > 0) await sleep(wait);
+  lastCurlAt = Date.now();
+  return curl(args);
 }
 
 /** Opent de sessie: één rustige GET op de homepage die de cookie-jar vult. */
@@ -408,6 +467,11 @@ export function parseSearchResults(body) {
 // komen, blijven simpelweg open.
 const MAX_ZOEKOPDRACHTEN = 5;
 
+// Na zoveel opgehaalde producten gaat wat er ligt alvast de database in. Een
+// product kost een verzoek aan ah.nl; een afgebroken recept (curl-fout,
+// Ctrl+C) mag er dan hooguit een paar kwijtraken, niet alles.
+const BEWAAR_PER = 5;
+
 /**
  * Zoekt één product voor een ingrediëntnaam via de webshop-zoekquery
  * (SEARCH_QUERY, dezelfde query als de handmatige zoekbalk van de app) en
@@ -459,10 +523,13 @@ async function fetchProductNutrition(curlCtx, id, depth = 0) {
  * src/nutrition/resolve.ts) leveren geen voedingswaarde op en hoeven dus
  * nooit verrijkt te worden; een recept dat alleen daarop "open" staat is
  * klaar. Opgeslagen null-koppelingen ("geen match") tellen niet mee, want
- * matchMap geeft alleen niet-nul-links terug.
+ * matchMap geeft alleen niet-nul-links terug, linkedIngredientNames ook.
  */
-export async function openIngredientNames(store, recipe) {
+export async function openIngredientNames(store, recipe, linked) {
   const names = recipe.ingredients.map((i) => i.name).filter((n) => !isNutritionFree(n));
+  // Met `linked` (store.linkedIngredientNames, één keer per ronde opgehaald)
+  // kost de controle geen query; zonder vraagt het de koppelingen zelf op.
+  if (linked) return names.filter((n) => !linked.has(n));
   const known = await store.matchMap(names);
   return names.filter((n) => !(n in known));
 }
@@ -487,6 +554,16 @@ export async function isRecipeDone(store, recipeId) {
   return (await store.getState(DONE_KEY + recipeId)) === "1";
 }
 
+/**
+ * Alle recepten met een klaar-markering, met één query. De watcher kijkt elke
+ * ronde naar elk recept; per recept een eigen getState kost dan honderden
+ * rondjes naar de database voor een antwoord dat bijna altijd "ja" is.
+ */
+export async function doneRecipeIds(store) {
+  const keys = await store.stateKeysWithPrefix(DONE_KEY);
+  return new Set(keys.map((key) => key.slice(DONE_KEY.length)));
+}
+
 export async function markRecipeDone(store, recipeId) {
   await store.setState(DONE_KEY + recipeId, "1");
 }
@@ -537,69 +614,90 @@ export async function enrichOneRecipe(store, curlCtx, recipe) {
   }
 
   const perIngredient = matchSuggestionsToIngredients(recipe.ingredients, suggestions);
+  // Welke voorgestelde producten er al staan, in één query vooraf in plaats van
+  // een getProduct per product; alleen een product uit de zoekterugval wordt
+  // nog los opgevraagd.
+  const voorgesteld = new Set(perIngredient.map((s) => s?.productId).filter(Boolean));
+  const bekend = await store.productMap([...voorgesteld]);
   const seen = new Set();
   let gekoppeld = 0;
   let nieuw = 0;
   let cached = 0;
   let fouten = 0;
   let zoekopdrachten = 0;
+  // Koppelingen en producten gaan samen in één batch de database in, met een
+  // upsert voor veel rijen tegelijk: elke BEWAAR_PER producten, en wat er aan
+  // het eind over is ook als er onderweg iets gooit.
+  const matches = [];
+  const products = [];
+  const bewaar = async () => {
+    if (products.length === 0 && matches.length === 0) return;
+    await store.putProductsAndMatches(products.splice(0), matches.splice(0));
+  };
 
-  for (const [index, ingredient] of recipe.ingredients.entries()) {
-    // Vrije ingrediënten (water, zout, peper) krijgen nooit een koppeling:
-    // ze leveren geen voedingswaarde op en een suggestie ernaast is per
-    // definitie een vergissing — ook niet als AH er wél een product voor
-    // suggereert.
-    if (isNutritionFree(ingredient.name)) continue;
-    let suggestion = perIngredient[index];
-    let score = 1;
-    // Geen suggestie van AH? Zoek het product zelf via de webshop-zoekquery
-    // en koppel de eerste hit. Vrije ingrediënten (water, zout, peper)
-    // worden nooit gezocht. De koppeling krijgt score 0.8: geen AH's eigen
-    // recept-suggestie maar een zoekresultaat.
-    if (!suggestion?.productId && !isNutritionFree(ingredient.name) && zoekopdrachten < MAX_ZOEKOPDRACHTEN) {
-      zoekopdrachten++;
+  try {
+    for (const [index, ingredient] of recipe.ingredients.entries()) {
+      // Vrije ingrediënten (water, zout, peper) krijgen nooit een koppeling:
+      // ze leveren geen voedingswaarde op en een suggestie ernaast is per
+      // definitie een vergissing — ook niet als AH er wél een product voor
+      // suggereert.
+      if (isNutritionFree(ingredient.name)) continue;
+      let suggestion = perIngredient[index];
+      let score = 1;
+      // Geen suggestie van AH? Zoek het product zelf via de webshop-zoekquery
+      // en koppel de eerste hit. Vrije ingrediënten (water, zout, peper)
+      // worden nooit gezocht. De koppeling krijgt score 0.8: geen AH's eigen
+      // recept-suggestie maar een zoekresultaat.
+      if (!suggestion?.productId && !isNutritionFree(ingredient.name) && zoekopdrachten < MAX_ZOEKOPDRACHTEN) {
+        zoekopdrachten++;
+        try {
+          suggestion = await searchFallback(curlCtx, ingredient.name);
+          if (suggestion) score = 0.8;
+        } catch (err) {
+          fouten++;
+          console.error(`  zoek '${ingredient.name}' mislukt: ${err.message}`);
+        }
+      }
+      if (!suggestion?.productId) continue;
+
+      gekoppeld++;
+      // De koppeling op naam kost niets en hangt de boodschappenlijst aan;
+      // AH's eigen suggestie is per definitie de juiste: score 1.
+      matches.push({ ingredientName: ingredient.name, webshopId: suggestion.productId, score });
+
+      if (seen.has(suggestion.productId)) continue;
+      seen.add(suggestion.productId);
+
+      const opgeslagen = voorgesteld.has(suggestion.productId)
+        ? suggestion.productId in bekend
+        : (await store.getProduct(suggestion.productId)) !== null;
+      if (opgeslagen) {
+        cached++;
+        continue;
+      }
+
+      let nutrition = null;
       try {
-        suggestion = await searchFallback(curlCtx, ingredient.name);
-        if (suggestion) score = 0.8;
+        nutrition = await fetchProductNutrition(curlCtx, numOf(suggestion.productId));
       } catch (err) {
         fouten++;
-        console.error(`  zoek '${ingredient.name}' mislukt: ${err.message}`);
+        console.error(`  product ${suggestion.productId} (${suggestion.productTitle ?? "?"}) mislukt: ${err.message}`);
+        continue;
       }
-    }
-    if (!suggestion?.productId) continue;
 
-    gekoppeld++;
-    // De koppeling op naam kost niets en hangt de boodschappenlijst aan;
-    // AH's eigen suggestie is per definitie de juiste: score 1.
-    await store.putMatch(ingredient.name, suggestion.productId, score);
-
-    if (seen.has(suggestion.productId)) continue;
-    seen.add(suggestion.productId);
-
-    if (await store.getProduct(suggestion.productId)) {
-      cached++;
-      continue;
-    }
-
-    let nutrition = null;
-    try {
-      nutrition = await fetchProductNutrition(curlCtx, numOf(suggestion.productId));
-    } catch (err) {
-      fouten++;
-      console.error(`  product ${suggestion.productId} (${suggestion.productTitle ?? "?"}) mislukt: ${err.message}`);
-      continue;
+      // Ook zonder voedingswaarde bewaren we het product: dan weten we dat we het
+      // al opgehaald hebben en kost een volgend recept er geen verzoek aan.
+      products.push({
+        webshopId: suggestion.productId,
+        title: suggestion.productTitle ?? suggestion.productId,
+        salesUnitSize: suggestion.salesUnitSize,
+        per100g: nutrition?.per100g ?? {},
+      });
+      nieuw++;
+      if (products.length >= BEWAAR_PER) await bewaar();
     }
-
-    // Ook zonder voedingswaarde bewaren we het product: dan weten we dat we het
-    // al opgehaald hebben en kost een volgend recept er geen verzoek aan.
-    await store.putProduct({
-      webshopId: suggestion.productId,
-      title: suggestion.productTitle ?? suggestion.productId,
-      salesUnitSize: suggestion.salesUnitSize,
-      per100g: nutrition?.per100g ?? {},
-    });
-    nieuw++;
+  } finally {
+    await bewaar();
   }
-
   return { gekoppeld, nieuw, cached, fouten };
 }
@@ -6,8 +6,9 @@
 // verrijkt), gebruik dan scripts/enrich-watch.mjs — die draait ook automatisch
 // mee bij start-app.bat en start-lokaal.bat.
 
-import "./ts-bootstrap.mjs";
-import { curlContext, enrichOneRecipe, findLocalDb, openStore } from "./enrich-lib.mjs";
+// ts-bootstrap en enrich-lib worden pas in main() geladen: samen zijn ze een
+// herstart van Node plus het transformeren van heel src/, en dat hoeft niet
+// voor alleen --help.
 import { dirname, join } from "node:path";
 import { fileURLToPath } from "node:url";
 
@@ -45,6 +46,9 @@ async function main() {
     return;
   }
 
+  await import("./ts-bootstrap.mjs");
+  const { curlContext, enrichOneRecipe, findLocalDb, openStore } = await import("./enrich-lib.mjs");
+
   const repoRoot = join(dirname(fileURLToPath(SCRIPT_URL)), "..");
   const d1File = findLocalDb(repoRoot);
   if (d1File === null) {
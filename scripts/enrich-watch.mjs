@@ -12,10 +12,11 @@
 import "./ts-bootstrap.mjs";
 import {
   curlContext,
+  doneRecipeIds,
   enrichOneRecipe,
   findLocalDb,
   markRecipeDone,
-  needsEnrichment,
+  openIngredientNames,
   openStore,
 } from "./enrich-lib.mjs";
 import { dirname, join } from "node:path";
@@ -29,6 +30,9 @@ const RONDE_INTERVAL_MS = 20_000;
 // Bovengrens per ronde, zodat de watcher nooit eindeloos bezig is: de
 // resterende recepten komen in een volgende ronde aan de beurt.
 const MAX_PER_RONDE = 5;
+// Hoeveel recepten de selectie per query laadt; zo blijft er ook bij een grote
+// database maar een handvol tegelijk in het geheugen.
+const LAAD_PER_KEER = 90;
 
 const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
 
@@ -44,21 +48,39 @@ function tijd() {
  */
 async function rondeUitvoeren(curl, store, ronde) {
   const ids = await store.allRecipeIds();
-  const kandidaten = [];
-  for (const recipeId of ids) {
-    const recipe = await store.getRecipe(recipeId);
-    if (!recipe) continue;
-    if (await needsEnrichment(store, recipe)) kandidaten.push(recipe);
+  // Zelfde selectie als needsEnrichment, maar de klaar-markeringen in één keer:
+  // een klaar recept hoeft dan niet eens geladen te worden.
+  const klaar = await doneRecipeIds(store);
+  // Net zo voor de koppelingen: één query voor de hele selectie, niet één per
+  // kandidaat. Tijdens het selecteren wordt er niets gekoppeld, dus de set
+  // blijft kloppen tot de verrijking begint.
+  const gekoppeld = await store.linkedIngredientNames();
+  // Alleen de recepten van deze ronde blijven in het geheugen; van de rest
+  // onthouden we hoeveel het er zijn, niet de recepten zelf.
+  // De recepten zelf komen per stuk van LAAD_PER_KEER binnen, met één query
+  // per stuk in plaats van één per recept.
+  const batch = [];
+  let kandidaten = 0;
+  const nogOpen = ids.filter((recipeId) => !klaar.has(recipeId));
+  for (let i = 0; i < nogOpen.length; i += LAAD_PER_KEER) {
+    const stuk = nogOpen.slice(i, i + LAAD_PER_KEER);
+    const recepten = await store.getRecipes(stuk);
+    for (const recipeId of stuk) {
+      const recipe = recepten.get(recipeId);
+      if (!recipe) continue;
+      if ((await openIngredientNames(store, recipe, gekoppeld)).length === 0) continue;
+      kandidaten++;
+      if (batch.length < MAX_PER_RONDE) batch.push(recipe);
+    }
   }
 
-  if (kandidaten.length === 0) {
+  if (kandidaten === 0) {
     console.log(
       `[${tijd()}] Ronde ${ronde}: verrijkingen: 0 (${ids.length} recepten; alle niet-vrije ingrediënten gekoppeld)`,
     );
     return false;
   }
 
-  const batch = kandidaten.slice(0, MAX_PER_RONDE);
   const totalen = { gekoppeld: 0, nieuw: 0, cached: 0, fouten: 0 };
   for (const recipe of batch) {
     const line = await enrichOneRecipe(store, curl, recipe);
@@ -79,7 +101,11 @@ async function rondeUitvoeren(curl, store, ronde) {
     );
   }
 
-  const rest = kandidaten.length - batch.length;
+  // Deze ronde is er geschreven: het WAL-bestand terugschrijven voordat de
+  // watcher weer twintig seconden slaapt, zodat het over uren niet aangroeit.
+  store.db.checkpoint();
+
+  const rest = kandidaten - batch.length;
   console.log(
     `[${tijd()}] Ronde ${ronde}: ${batch.length} recepten verrijkt (${totalen.gekoppeld} koppelingen, ` +
       `${totalen.nieuw} producten nieuw, ${totalen.cached} uit cache, ${totalen.fouten} fout(en))` +
@@ -101,12 +127,25 @@ async function main() {
   console.log("Ctrl+C stopt hem. (Eénmalig alles verrijken: node scripts/enrich-local.mjs)");
 
   const curl = curlContext();
+  // Eén verbinding over de rondes heen: een idle verbinding houdt geen locks
+  // vast, dus de dev-server merkt er niets van, en elke ronde opnieuw openen
+  // kost telkens weer het inlezen van het schema en een koude page-cache.
+  // Alleen na een fout of als de database elders opduikt, gaat hij dicht.
+  let store = null;
+  let storeFile = null;
+  const sluit = () => {
+    store?.db.close();
+    store = null;
+    storeFile = null;
+  };
+
   let ronde = 0;
   for (;;) {
     if (ronde > 0) await sleep(RONDE_INTERVAL_MS);
     ronde++;
 
     const d1File = findLocalDb(repoRoot);
+    if (d1File !== storeFile) sluit();
     if (d1File === null) {
       // Geen database (nog): de dev-server mag gewoon eerst starten. Niet
       // stoppen, want dan zou de watcher nooit opstarten vóór de dev-server.
@@ -117,25 +156,27 @@ async function main() {
       continue;
     }
 
-    let store;
-    try {
-      store = openStore(d1File);
-    } catch (err) {
-      console.log(
-        `[${tijd()}] Ronde ${ronde}: database ${d1File} kon niet worden geopend (${err.message}) — ` +
-          `herkansing over ${RONDE_INTERVAL_MS / 1000} s`,
-      );
-      continue;
+    if (store === null) {
+      try {
+        store = openStore(d1File);
+        storeFile = d1File;
+      } catch (err) {
+        console.log(
+          `[${tijd()}] Ronde ${ronde}: database ${d1File} kon niet worden geopend (${err.message}) — ` +
+            `herkansing over ${RONDE_INTERVAL_MS / 1000} s`,
+        );
+        continue;
+      }
     }
 
     try {
       await rondeUitvoeren(curl, store, ronde);
     } catch (err) {
       // Bijv. een database die net opnieuw aangemaakt wordt (tabellen nog
-      // niet aanwezig): melden en de volgende ronde opnieuw proberen.
+      // niet aanwezig): melden, de verbinding sluiten en de volgende ronde
+      // vers opnieuw proberen.
       console.log(`[${tijd()}] Ronde ${ronde}: ${err.message}`);
-    } finally {
-      store.db.close();
+      sluit();
     }
   }
 }
@@ -9,8 +9,10 @@
 // bestaat.
 //
 // Importeer dit als het eerste import-statement van elk script dat src/-
-// modules laadt (nu: enrich-local.mjs en enrich-watch.mjs). Onder vitest niet
-// importeren: daar regelt de Vite-resolver het laden van TS zelf.
+// modules laadt (nu: enrich-local.mjs en enrich-watch.mjs), of dynamisch vóór
+// de eerste import van enrich-lib als het script eerst iets goedkoops doet
+// (enrich-local.mjs --help). Onder vitest niet importeren: daar regelt de
+// Vite-resolver het laden van TS zelf.
 
 import { spawnSync } from "node:child_process";
 import { registerHooks } from "node:module";
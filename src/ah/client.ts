@@ -1,10 +1,8 @@
 import type { Nutrients, Product, RawIngredient, Recipe } from "./types";
 import { isKnownUnit } from "../nutrition/units";
-import { resetPace, sharedPace } from "./pace";
+import { backOff, discardBody, resetPace, sharedPace } from "./pace";
 import { deepFind, extractEmbeddedJson } from "./scrape";
 
-const sleep = (ms: number) => new Promise((resolve) => setTimeout(resolve, ms));
-
 const AUTH_URL = "https://api.ah.nl/mobile-auth/v1/auth/token/anonymous";
 const PRODUCT_SEARCH_URL = "https://api.ah.nl/mobile-services/product/search/v2";
 const PRODUCT_DETAIL_URL = "https://api.ah.nl/mobile-services/product/detail/v4/fir";
@@ -29,6 +27,14 @@ let recipeSearchJsonDead = false;
  */
 let productApiDead = false;
 
+/**
+ * Het anonieme token van de mobiele API. Elke aanroep van de worker maakt een
+ * eigen client, en die vroeg steeds opnieuw een token aan: een extra verzoek
+ * (uit hetzelfde subrequest-budget) voor iets dat uren geldig blijft. Nu deelt
+ * het hele isolate er één; een 401 gooit het weg en de volgende vraagt een nieuw.
+ */
+let anonymousToken: string | null = null;
+
 /**
  * Een worker mag maar een beperkt aantal uitgaande verzoeken doen per aanroep
  * (op het gratis plan 50). Ging dat op, dan brak Cloudflare de ronde midden in
@@ -54,6 +60,7 @@ export const isBudgetError = (err: unknown): err is SubrequestBudgetError =>
 export function resetEndpointState(): void {
   recipeSearchJsonDead = false;
   productApiDead = false;
+  anonymousToken = null;
   resetPace();
 }
 
@@ -75,8 +82,6 @@ export interface RawScrape {
  * than throwing, and `probe()` reports which paths are currently alive.
  */
 export class AhClient {
-  private token: string | null = null;
-
   /**
    * `onRaw` krijgt elke response binnen voordat er geparsed wordt. Daar hangt de
    * archivering aan: gaat het parsen daarna stuk, dan is de payload toch bewaard.
@@ -131,7 +136,7 @@ export class AhClient {
   }
 
   private async authHeaders(): Promise<Record<string, string>> {
-    if (!this.token) {
+    if (!anonymousToken) {
       const res = await fetch(AUTH_URL, {
         method: "POST",
         headers: {
@@ -141,13 +146,16 @@ export class AhClient {
         },
         body: JSON.stringify({ clientId: "appie" }),
       });
-      if (!res.ok) throw new Error(`AH anonymous auth failed: ${res.status}`);
+      if (!res.ok) {
+        await discardBody(res);
+        throw new Error(`AH anonymous auth failed: ${res.status}`);
+      }
       const body = (await res.json()) as { access_token?: string };
       if (!body.access_token) throw new Error("AH auth response had no access_token");
-      this.token = body.access_token;
+      anonymousToken = body.access_token;
     }
     return {
-      Authorization: `Bearer ${this.token}`,
+      Authorization: `Bearer ${anonymousToken}`,
       "User-Agent": this.userAgent,
       "X-Application": "AHWEBSHOP",
       Accept: "application/json",
@@ -160,7 +168,8 @@ export class AhClient {
       await this.pace();
       const res = await fetch(url, { headers: await this.authHeaders() });
       if (res.status === 401 && attempt === 0) {
-        this.token = null;
+        await discardBody(res);
+        anonymousToken = null;
         continue;
       }
       // Lees als tekst, niet als JSON: ook een onparseerbaar antwoord hoort in
@@ -208,7 +217,7 @@ export class AhClient {
       // 403 en 429 zijn "te snel", geen "bestaat niet": die zijn het proberen waard.
       const worthRetrying = res.status === 403 || res.status === 429 || res.status >= 500;
       if (!worthRetrying || attempt === this.maxRetries) break;
-      await sleep(this.backoffMs * 2 ** attempt);
+      await backOff(res, this.backoffMs * 2 ** attempt, this.minIntervalMs);
     }
 
     throw new Error(`GET ${url} -> ${lastStatus}`);
@@ -270,18 +279,19 @@ export class AhClient {
       kind: "product",
       ref: webshopId,
     });
-    const card = deepFind(body, (v) => isRecord(v) && "webshopId" in v && "title" in v);
-    const stub = toProductStub(card ?? body);
+    const detail = parseProductDetail(body);
+    const stub = toProductStub(detail.card ?? body);
     if (!stub) return null;
-    let per100g = parseNutrition(body);
+    let per100g = detail.per100g;
     // The v4 mobile detail response stopped including nutrition in 2026. The
-    // server-rendered product page still contains a labelled per-100g table.
+    // server-rendered product page still contains a labelled per-100g table;
+    // that fills in only what the detail response left out.
     if (per100g.kcal === undefined || per100g.protein === undefined) {
       const html = await this.htmlGet(`${PRODUCT_PAGE_URL}${encodeURIComponent(webshopId)}`, {
         kind: "product",
         ref: webshopId,
       });
-      per100g = parseNutritionHtml(html);
+      per100g = parseNutritionHtml(html, per100g);
     }
     return { ...stub, webshopId, per100g };
   }
@@ -366,6 +376,27 @@ function isRecord(v: unknown): v is Record<string, unknown> {
   return typeof v === "object" && v !== null && !Array.isArray(v);
 }
 
+/**
+ * Loopt elk object in een payload af, ouder vóór kinderen en in
+ * documentvolgorde: dezelfde volgorde als een recursieve wandeling, maar met een
+ * eigen werklijst. Een diep geneste flight-stream kan zo de call stack niet
+ * laten overlopen, en losse waarden komen de lijst niet eens in. Geeft `visit`
+ * false terug, dan stopt de wandeling.
+ */
+function walkRecords(root: unknown, visit: (v: Record<string, unknown>) => boolean | void): void {
+  const stack: unknown[] = [root];
+  while (stack.length > 0) {
+    const v = stack.pop();
+    const children = Array.isArray(v) ? v : isRecord(v) ? Object.values(v) : null;
+    if (children === null) continue;
+    if (!Array.isArray(v) && visit(v as Record<string, unknown>) === false) return;
+    for (let i = children.length - 1; i >= 0; i--) {
+      const child = children[i];
+      if (typeof child === "object" && child !== null) stack.push(child);
+    }
+  }
+}
+
 function num(v: unknown): number | null {
   if (typeof v === "number" && Number.isFinite(v)) return v;
   if (typeof v === "string") {
@@ -373,15 +404,21 @@ function num(v: unknown): number | null {
     // getallen maar zien er wel zo uit: hieronder zou dat 21 opleveren. Zo werd
     // een borrelhapje voor 4 personen een recept van "21 porties".
     if (v.startsWith("$")) return null;
-    // AH writes values like "12,5 g" and "1.234 kJ".
-    const m = v.replace(",", ".").match(/-?\d+(\.\d+)?/);
-    if (m) return Number(m[0]);
+    // AH writes values like "12,5 g" and "1.234 kJ". De komma pas in de
+    // treffer vervangen: dit draait op elk tekstblad van een payload, en een
+    // kopie van de hele string voor één getal is daar zonde.
+    const m = NUMBER_IN_TEXT.exec(v);
+    if (m) return Number(m[0].replace(",", "."));
   }
   return null;
 }
 
+const NUMBER_IN_TEXT = /-?\d+(?:[.,]\d+)?/;
+
 function str(v: unknown): string | null {
-  return typeof v === "string" && v.trim() !== "" ? v.trim() : null;
+  if (typeof v !== "string") return null;
+  const trimmed = v.trim();
+  return trimmed !== "" ? trimmed : null;
 }
 
 export function toProductStub(v: unknown): Product | null {
@@ -402,76 +439,165 @@ export function toProductStub(v: unknown): Product | null {
   };
 }
 
-/** Maps AH's Dutch nutrient labels onto our keys. Order matters: longest match wins. */
-const NUTRIENT_LABELS: [RegExp, keyof Nutrients][] = [
-  [/verzadigd/i, "fat"], // saturated fat is a sub-row; skip it below
-  [/energie|calorie|kcal/i, "kcal"],
-  [/eiwit|protein/i, "protein"],
-  [/koolhydra|carbohydr/i, "carbs"],
-  [/vezel|fibre|fiber/i, "fiber"],
-  [/vet|fat/i, "fat"],
+/**
+ * Maps AH's Dutch nutrient labels onto our keys. Order matters: the first entry
+ * with a word in the label wins, so "vet" comes after everything that contains
+ * it. Plain substrings of the lowercased label: one `toLowerCase` per row instead
+ * of a case-insensitive regex per candidate key.
+ */
+const NUTRIENT_LABELS: [readonly string[], keyof Nutrients][] = [
+  [["energie", "calorie", "kcal"], "kcal"],
+  [["eiwit", "protein"], "protein"],
+  [["koolhydra", "carbohydr"], "carbs"],
+  [["vezel", "fibre", "fiber"], "fiber"],
+  [["vet", "fat"], "fat"],
 ];
 
+/** "waarvan verzadigde vetzuren" etc. are sub-rows of a macro we already have. */
+const SUB_ROW_WORDS = ["waarvan", "verzadigd", "suiker", "zout", "natrium"];
+
+/**
+ * De twee lijsten hierboven als één patroon met een groep per sleutel: één
+ * scan over het label in plaats van een `includes` per woord. De lijsten
+ * blijven de bron; de volgorde daarin blijft de voorrang.
+ */
+const NUTRIENT_LABEL = new RegExp(
+  [
+    `(?<sub>${SUB_ROW_WORDS.join("|")})`,
+    ...NUTRIENT_LABELS.map(([words, key]) => `(?<${key}>${words.join("|")})`),
+  ].join("|"),
+  "g",
+);
+
+/** De standaarddiepte van `deepFind`, waar `parseProductDetail` zich aan houdt. */
+const DEEP_FIND_DEPTH = 12;
+
+/** Hoeveel sleutels `NUTRIENT_LABELS` kan vullen; zijn ze er allemaal, dan zijn we klaar. */
+const NUTRIENT_KEY_COUNT = new Set(NUTRIENT_LABELS.map(([, key]) => key)).size;
+
 /**
  * Pulls per-100g nutrition out of a product detail payload. AH has shipped several
  * shapes over the years, so this walks the whole object looking for label/value
- * pairs rather than following a fixed path.
+ * pairs rather than following a fixed path. The first value per key wins, so the
+ * walk stops as soon as every key has one: the rest of a product payload (often
+ * hundreds of kB of images and marketing copy) cannot change the answer.
  */
 export function parseNutrition(body: unknown): Nutrients {
   const out: Nutrients = {};
   const seen = new Set<string>();
 
-  const visit = (v: unknown): void => {
-    if (Array.isArray(v)) {
-      v.forEach(visit);
-      return;
+  walkRecords(body, (v) => {
+    readNutrientNode(out, seen, v);
+    return seen.size < NUTRIENT_KEY_COUNT;
+  });
+  return out;
+}
+
+/**
+ * De productkaart en de voedingswaarde uit één detail-respons, in één wandeling.
+ * Eerst de kaart zoeken en daarna de voedingswaarde liep dezelfde respons twee
+ * keer af — en de tweede keer helemaal, want daar staat sinds 2026 geen
+ * voedingswaarde meer in. De kaart is dezelfde die `deepFind` zou geven: die
+ * loopt van achter naar voren en neemt de eerste treffer, en dat is precies de
+ * laatste die deze wandeling ná zijn kinderen tegenkomt (tot dezelfde diepte).
+ */
+export function parseProductDetail(body: unknown): {
+  card: Record<string, unknown> | null;
+  per100g: Nutrients;
+} {
+  const per100g: Nutrients = {};
+  const seen = new Set<string>();
+  let card: Record<string, unknown> | null = null;
+
+  // Een eigen werklijst, net als `walkRecords`, zodat een diep geneste respons
+  // de call stack niet laat overlopen; hier met diepte erbij. Een kaart komt als
+  // aparte stap ná zijn kinderen op de lijst, zodat de volgorde precies die van
+  // de recursieve wandeling blijft.
+  const stack: ({ v: unknown; depth: number } | { card: Record<string, unknown> })[] = [{ v: body, depth: 0 }];
+  while (stack.length > 0) {
+    const step = stack.pop()!;
+    if ("card" in step) {
+      card = step.card;
+      continue;
     }
-    if (!isRecord(v)) return;
-
-    const label = str(v["name"]) ?? str(v["label"]) ?? str(v["nutrientName"]);
-    const rawValue = v["value"] ?? v["valuePer100g"] ?? v["amount"] ?? v["quantity"];
-    const value = num(rawValue);
-
-    if (label && value !== null) {
-      // "waarvan verzadigde vetzuren" etc. are sub-rows of a macro we already have.
-      const isSubRow = /waarvan|verzadigd|suiker|zout|natrium/i.test(label);
-      if (!isSubRow) {
-        for (const [re, key] of NUTRIENT_LABELS) {
-          if (key === "fat" && /verzadigd/i.test(label)) break;
-          if (!re.test(label)) continue;
-          if (seen.has(key)) break;
-          // Energy is listed as kJ first, then kcal, and AH puts the unit in the
-          // label on some payloads and in the value on others — check both.
-          const withUnit = `${label} ${String(rawValue)}`;
-          if (key === "kcal" && /kj/i.test(withUnit) && !/kcal/i.test(withUnit)) break;
-          out[key] = key === "kcal" ? kcalValue(rawValue, label) ?? value : value;
-          seen.add(key);
-          break;
-        }
-      }
+    const { v, depth } = step;
+    const children = Array.isArray(v) ? v : isRecord(v) ? Object.values(v) : null;
+    if (children === null) continue;
+    if (isRecord(v)) {
+      if (seen.size < NUTRIENT_KEY_COUNT) readNutrientNode(per100g, seen, v);
+      if (depth <= DEEP_FIND_DEPTH && "webshopId" in v && "title" in v) stack.push({ card: v });
     }
-    Object.values(v).forEach(visit);
-  };
+    for (let i = children.length - 1; i >= 0; i--) {
+      const child = children[i];
+      if (typeof child === "object" && child !== null) stack.push({ v: child, depth: depth + 1 });
+    }
+  }
+  return { card, per100g };
+}
 
-  visit(body);
-  return out;
+/** Eén object uit een payload dat een voedingsrij kan zijn. */
+function readNutrientNode(out: Nutrients, seen: Set<string>, v: Record<string, unknown>): void {
+  const label = str(v["name"]) ?? str(v["label"]) ?? str(v["nutrientName"]);
+  const rawValue = v["value"] ?? v["valuePer100g"] ?? v["amount"] ?? v["quantity"];
+  if (label) readNutrientRow(out, seen, label, rawValue);
 }
 
-/** Reads AH's current server-rendered "Per 100 Gram" nutrition table. */
-export function parseNutritionHtml(html: string): Nutrients {
-  const table = html.match(
-    /<table[^>]*data-testid="nutrition-table"[^>]*>([\s\S]*?)<\/table>/i,
-  )?.[1];
-  if (!table) return {};
+/** Eén label/waarde-paar naar `out`, als het een macro is die we nog niet hebben. */
+function readNutrientRow(out: Nutrients, seen: Set<string>, label: string, rawValue: unknown): void {
+  const value = num(rawValue);
+  if (value === null) return;
+  const lower = label.toLowerCase();
+  let rank = NUTRIENT_LABELS.length;
+  for (const match of lower.matchAll(NUTRIENT_LABEL)) {
+    const groups = match.groups!;
+    if (groups["sub"] !== undefined) return;
+    const found = NUTRIENT_LABELS.findIndex(([, key]) => groups[key] !== undefined);
+    if (found >= 0 && found < rank) rank = found;
+  }
+  const key = NUTRIENT_LABELS[rank]?.[1];
+  if (key === undefined || seen.has(key)) return;
+  // Energy is listed as kJ first, then kcal, and AH puts the unit in the
+  // label on some payloads and in the value on others — check both.
+  if (key === "kcal") {
+    const withUnit = `${lower} ${String(rawValue).toLowerCase()}`;
+    if (withUnit.includes("kj") && !withUnit.includes("kcal")) return;
+  }
+  out[key] = key === "kcal" ? kcalValue(rawValue, label) ?? value : value;
+  seen.add(key);
+}
+
+/**
+ * Reads AH's current server-rendered "Per 100 Gram" nutrition table. De rijen
+ * gaan rechtstreeks door `readNutrientRow`, zonder eerst een object te bouwen
+ * dat `parseNutrition` daarna weer helemaal moet aflopen.
+ *
+ * `known` is wat er al uit een andere bron kwam; de tabel vult alleen aan wat
+ * daar ontbreekt, en is er niets meer te vullen dan wordt er niet gezocht.
+ */
+export function parseNutritionHtml(html: string, known: Nutrients = {}): Nutrients {
+  const out: Nutrients = { ...known };
+  const seen = new Set<string>(Object.keys(known).filter((k) => out[k as keyof Nutrients] !== undefined));
+  if (seen.size === NUTRIENT_KEY_COUNT) return out;
+
+  // De tabel is een paar kB van een pagina van honderden kB. indexOf vindt hem
+  // zonder de regex-engine over de rest te halen; de regex ziet alleen het
+  // stukje vanaf de eigen <table>-tag.
+  const marker = html.indexOf('data-testid="nutrition-table"');
+  if (marker < 0) return out;
+  const tableStart = html.lastIndexOf("<table", marker);
+  if (tableStart < 0) return out;
+  const table = html
+    .slice(tableStart)
+    .match(/^<table[^>]*data-testid="nutrition-table"[^>]*>([\s\S]*?)<\/table>/i)?.[1];
+  if (!table) return out;
 
-  const rows: { name: string; value: string }[] = [];
   for (const match of table.matchAll(/<tr\b[^>]*>([\s\S]*?)<\/tr>/gi)) {
-    const cells = [...(match[1] ?? "").matchAll(/<td\b[^>]*>([\s\S]*?)<\/td>/gi)].map((m) =>
-      htmlText(m[1] ?? ""),
-    );
-    if (cells.length >= 2) rows.push({ name: cells[0]!, value: cells[1]! });
+    const cells = [...(match[1] ?? "").matchAll(/<td\b[^>]*>([\s\S]*?)<\/td>/gi)];
+    if (cells.length < 2) continue;
+    readNutrientRow(out, seen, htmlText(cells[0]![1] ?? ""), htmlText(cells[1]![1] ?? ""));
+    if (seen.size === NUTRIENT_KEY_COUNT) break;
   }
-  return parseNutrition({ rows });
+  return out;
 }
 
 function kcalValue(raw: unknown, label: string): number | null {
@@ -489,12 +615,7 @@ export function collectProducts(root: unknown): Product[] {
   const out: Product[] = [];
   const seen = new Set<string>();
 
-  const visit = (v: unknown): void => {
-    if (Array.isArray(v)) {
-      v.forEach(visit);
-      return;
-    }
-    if (!isRecord(v)) return;
+  walkRecords(root, (v) => {
     if ("webshopId" in v && ("title" in v || "name" in v)) {
       const stub = toProductStub(v);
       if (stub && !seen.has(stub.webshopId)) {
@@ -502,13 +623,13 @@ export function collectProducts(root: unknown): Product[] {
         out.push(stub);
       }
     }
-    Object.values(v).forEach(visit);
-  };
-
-  visit(root);
+  });
   return out;
 }
 
+const PRODUCT_PATH = "/producten/product/";
+const PRODUCT_LINK_REST = /wi(\d+)\/([a-z0-9-]+)/iy;
+
 /**
  * De laatste terugval: de links naar productpagina's in de HTML. De slug is de
  * titel met streepjes ("ah-magere-kwark"), wat voor de matcher net zo bruikbaar
@@ -517,7 +638,14 @@ export function collectProducts(root: unknown): Product[] {
 export function parseProductLinks(html: string): Product[] {
   const out: Product[] = [];
   const seen = new Set<string>();
-  for (const match of html.matchAll(/\/producten\/product\/wi(\d+)\/([a-z0-9-]+)/gi)) {
+  // Het pad is een vaste tekst; alleen het stuk erna varieert. indexOf springt
+  // van link naar link, en de regex kijkt alleen op die plek of er een id en
+  // slug volgen. AH schrijft zijn paden in kleine letters.
+  const rest = new RegExp(PRODUCT_LINK_REST);
+  for (let at = html.indexOf(PRODUCT_PATH); at >= 0; at = html.indexOf(PRODUCT_PATH, at + 1)) {
+    rest.lastIndex = at + PRODUCT_PATH.length;
+    const match = rest.exec(html);
+    if (!match) continue;
     const id = match[1];
     const slug = match[2];
     if (!id || !slug || seen.has(id)) continue;
@@ -551,13 +679,7 @@ export function collectRecipes(root: unknown): Recipe[] {
   const out: Recipe[] = [];
   const byId = new Map<string, Recipe>();
 
-  const visit = (v: unknown): void => {
-    if (Array.isArray(v)) {
-      v.forEach(visit);
-      return;
-    }
-    if (!isRecord(v)) return;
-
+  walkRecords(root, (v) => {
     const url = str(v["href"]) ?? str(v["url"]);
     const rawId =
       str(v["id"]) ??
@@ -590,10 +712,7 @@ export function collectRecipes(root: unknown): Recipe[] {
         out.push(found);
       }
     }
-    Object.values(v).forEach(visit);
-  };
-
-  visit(root);
+  });
   return out;
 }
 
@@ -642,9 +761,12 @@ export function parseRecipeCards(html: string): Recipe[] {
   for (const match of html.matchAll(/<a\b([^>]*\bdata-testid="recipe-card"[^>]*)>/gi)) {
     const attrs = match[1] ?? "";
     const href = attrs.match(/\bhref="([^"]+)"/i)?.[1];
-    const titleAttr = attrs.match(/\btitle="([^"]+)"/i)?.[1];
     const id = recipeIdFromUrl(href ?? null);
-    if (!href || !titleAttr || !id || seen.has(id)) continue;
+    // Staat een recept al in de lijst, dan kost elke volgende kaart ervan geen
+    // regex meer.
+    if (!href || !id || seen.has(id)) continue;
+    const titleAttr = attrs.match(/\btitle="([^"]+)"/i)?.[1];
+    if (!titleAttr) continue;
     seen.add(id);
     out.push({
       id,
@@ -677,15 +799,23 @@ function recipeIdFromUrl(url: string | null): string | null {
   return match?.[1]?.toUpperCase() ?? null;
 }
 
+const NAMED_ENTITIES: Record<string, string> = { quot: '"', apos: "'", amp: "&", lt: "<", gt: ">" };
+
+/**
+ * Eén sweep over de tekst in plaats van een keten van replaces: elke entity
+ * wordt precies één keer vertaald, dus "&amp;lt;" blijft netjes "&lt;" in
+ * plaats van alsnog een "<" te worden.
+ */
 function decodeHtml(value: string): string {
-  return value
-    .replace(/&#x([0-9a-f]+);/gi, (_, hex: string) => String.fromCodePoint(Number.parseInt(hex, 16)))
-    .replace(/&#(\d+);/g, (_, decimal: string) => String.fromCodePoint(Number(decimal)))
-    .replace(/&quot;/g, '"')
-    .replace(/&apos;|&#39;/g, "'")
-    .replace(/&amp;/g, "&")
-    .replace(/&lt;/g, "<")
-    .replace(/&gt;/g, ">");
+  if (!value.includes("&")) return value;
+  return value.replace(
+    /&(?:#[xX]([0-9a-fA-F]+)|#(\d+)|(quot|apos|amp|lt|gt));/g,
+    (entity, hex: string | undefined, decimal: string | undefined, name: string | undefined) => {
+      if (hex !== undefined) return String.fromCodePoint(Number.parseInt(hex, 16));
+      if (decimal !== undefined) return String.fromCodePoint(Number(decimal));
+      return NAMED_ENTITIES[name!] ?? entity;
+    },
+  );
 }
 
 function findImageUrl(v: Record<string, unknown>): string | null {
@@ -696,17 +826,22 @@ function findImageUrl(v: Record<string, unknown>): string | null {
   return typeof img === "string" ? img : null;
 }
 
+/** Komma's tussen labels en schuine strepen tussen varianten, in één keer. */
+const KEYWORD_SEPARATORS = /[,/]/;
+
 /**
  * AH's eigen labels. Het `keywords`-veld is één string met komma's:
  * "gezond, vooraf te maken, brood/sandwiches, tussendoortje, grillen".
  * Schuine strepen scheiden varianten van hetzelfde label, dus die splitsen we ook.
+ * Een string gaat in één split op beide tekens uit elkaar, in plaats van eerst
+ * op komma's en dan elk stuk nog eens op strepen.
  */
 export function parseKeywords(v: unknown, extra?: unknown): string[] {
   const out = new Set<string>();
 
-  const add = (value: unknown): void => {
+  const add = (value: unknown, separator: string | RegExp = "/"): void => {
     if (typeof value !== "string") return;
-    for (const part of value.split("/")) {
+    for (const part of value.split(separator)) {
       const clean = part.trim().toLowerCase();
       if (clean) out.add(clean);
     }
@@ -714,7 +849,7 @@ export function parseKeywords(v: unknown, extra?: unknown): string[] {
 
   for (const source of [v, extra]) {
     if (typeof source === "string") {
-      source.split(",").forEach(add);
+      add(source, KEYWORD_SEPARATORS);
       continue;
     }
     if (!Array.isArray(source)) continue;
@@ -846,18 +981,22 @@ function unitOf(item: Record<string, unknown>): string | null {
   return str(raw["singular"]) ?? str(raw["name"]) ?? str(raw["plural"]);
 }
 
+const LEADING_QUANTITY = /^(\d+(?:[.,]\d+)?)\s*(.*)$/;
+const UNIT_WORD = /^([a-z]+\.?)\s+(.+)$/;
+
 /**
  * Parses a free-text line like "250 g kipfilet" or "2 el olijfolie". The word right
  * after the quantity is only taken as a unit when it actually is one — otherwise
  * ("3 rijpe bananen") it's an adjective and belongs in the name, with no unit.
  */
 export function parseIngredientText(text: string): RawIngredient {
-  const m = text.trim().toLowerCase().match(/^(\d+(?:[.,]\d+)?)\s*(.*)$/);
-  if (!m || !m[1] || !m[2]) return { name: text.trim().toLowerCase(), quantity: null, unit: null };
+  const line = text.trim().toLowerCase();
+  const m = LEADING_QUANTITY.exec(line);
+  if (!m || !m[1] || !m[2]) return { name: line, quantity: null, unit: null };
 
   const quantity = Number(m[1].replace(",", "."));
   const rest = m[2].trim();
-  const wordMatch = rest.match(/^([a-z]+\.?)\s+(.+)$/);
+  const wordMatch = UNIT_WORD.exec(rest);
   if (wordMatch && wordMatch[1] && wordMatch[2] && isKnownUnit(wordMatch[1])) {
     return { quantity, unit: wordMatch[1], name: wordMatch[2].trim() };
   }
@@ -1,6 +1,6 @@
 import { SubrequestBudgetError } from "./client";
 import { parseTradeItem, type TradeItemNutrition } from "./gql-nutrition";
-import { sharedPace } from "./pace";
+import { backOff, discardBody, sharedPace } from "./pace";
 
 export { SubrequestBudgetError };
 
@@ -28,8 +28,6 @@ export { SubrequestBudgetError };
 export const GQL_URL = "https://www.ah.nl/gql";
 export const HOME_URL = "https://www.ah.nl/";
 
-const sleep = (ms: number) => new Promise((resolve) => setTimeout(resolve, ms));
-
 /** Eén product-suggestie voor een recept-regel, zoals AH hem voorstelt. */
 export interface ProductSuggestion {
   /** De regel zoals AH hem noemt, bijv. "biologische kikkererwten". */
@@ -135,6 +133,9 @@ export class GqlClient {
         "Accept-Language": "nl-NL,nl;q=0.9",
       },
     });
+    // Van de homepage hebben we alleen de cookies nodig, niet de paar honderd
+    // kB HTML erachter.
+    await discardBody(res);
     if (!res.ok) throw new Error(`GET ${HOME_URL} -> ${res.status}`);
     const cookies = typeof res.headers.getSetCookie === "function" ? res.headers.getSetCookie() : [];
     const parts = cookies.length > 0 ? cookies : [res.headers.get("set-cookie") ?? ""];
@@ -173,11 +174,12 @@ export class GqlClient {
         body: JSON.stringify({ query, variables }),
       });
       if (res.ok) return res.json();
+      await discardBody(res);
       if (res.status !== 403 && res.status !== 429 && res.status < 500) {
         throw new Error(`POST ${GQL_URL} -> ${res.status}`);
       }
       if (attempt === this.maxRetries) throw new Error(`POST ${GQL_URL} -> ${res.status}`);
-      await sleep(this.backoffMs * 2 ** attempt);
+      await backOff(res, this.backoffMs * 2 ** attempt, this.minIntervalMs);
     }
     throw new Error(`POST ${GQL_URL} failed`);
   }
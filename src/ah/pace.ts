@@ -13,11 +13,63 @@ const sleep = (ms: number) => new Promise((resolve) => setTimeout(resolve, ms));
 
 let lastRequestAt = 0;
 
-/** Rust tussen twee verzoeken aan ah.nl, zodat Akamai ons niet op tempo blokkeert. */
+/**
+ * Rust tussen twee verzoeken aan ah.nl, zodat Akamai ons niet op tempo blokkeert.
+ *
+ * Het tijdstip wordt vastgelegd vóór het wachten, niet erna. Anders lezen twee
+ * gelijktijdige aanroepen dezelfde klok, slapen ze even lang en gaan ze samen
+ * de deur uit; zo krijgt de tweede het volgende vrije moment na de eerste.
+ */
 export async function sharedPace(minIntervalMs: number): Promise<void> {
-  const wait = minIntervalMs - (Date.now() - lastRequestAt);
-  if (wait > 0) await sleep(wait);
-  lastRequestAt = Date.now();
+  const now = Date.now();
+  const at = Math.max(now, lastRequestAt + minIntervalMs);
+  lastRequestAt = at;
+  if (at > now) await sleep(at - now);
+}
+
+/**
+ * Hoe lang een `Retry-After` ons hoogstens laat wachten. Eén aanroep van de
+ * worker kan een paar herkansingen doen, en die mogen samen geen minuut
+ * stilstaan. Vraagt ah.nl om meer, dan is het een blokkade, en daar is de
+ * afkoelperiode van de cron voor.
+ */
+const MAX_RETRY_AFTER_MS = 5_000;
+
+/** Een `Retry-After`-header in milliseconden: seconden of een HTTP-datum, anders 0. */
+export function retryAfterMs(value: string | null, now = Date.now()): number {
+  if (!value) return 0;
+  const ms = /^\s*\d+\s*$/.test(value) ? Number(value) * 1000 : Date.parse(value) - now;
+  return Number.isFinite(ms) ? Math.min(Math.max(0, ms), MAX_RETRY_AFTER_MS) : 0;
+}
+
+/**
+ * Wacht na een 403/429/5xx voor de herkansing: de eigen oplopende wachttijd,
+ * of langer als ah.nl zelf met `Retry-After` zegt hoe lang. Die wachttijd gaat
+ * ook op de gedeelde klok, zodat een andere client in dit isolate niet midden
+ * in de pauze alsnog aanklopt. De klok komt een tussenpoos vóór het einde van
+ * de pauze te staan: de herkansing roept daarna zelf `sharedPace` aan, en die
+ * telt `minIntervalMs` er weer bij — anders wachtte elke herkansing de pauze
+ * plus nog een hele tussenpoos.
+ */
+export async function backOff(res: Response, fallbackMs: number, minIntervalMs: number): Promise<void> {
+  const ms = Math.max(fallbackMs, retryAfterMs(res.headers.get("Retry-After")));
+  lastRequestAt = Math.max(lastRequestAt, Date.now() + ms - minIntervalMs);
+  await sleep(ms);
+}
+
+/**
+ * Ruimt de body op van een antwoord dat we niet lezen. De runtime houdt elke
+ * verbinding naar ah.nl open voor het volgende verzoek, maar pas als de body
+ * helemaal gelezen of afgebroken is; een blijven-hangende body kost bij het
+ * volgende verzoek een verse TCP- en TLS-opbouw, en telt zolang mee als open
+ * verbinding van deze aanroep.
+ */
+export async function discardBody(res: Response): Promise<void> {
+  try {
+    await res.body?.cancel();
+  } catch {
+    // al gelezen of al dicht: niets meer te doen
+  }
 }
 
 /** Alleen voor tests: zet de klok terug zodat er niets tussen tests lekt. */
@@ -4,35 +4,92 @@
  * the markup — parsing that is both easier and far more stable than CSS selectors.
  */
 
-/** Script tags known to carry the page's serialised state. */
-const STATE_SCRIPTS = [
-  /<script[^>]*id="__NEXT_DATA__"[^>]*>([\s\S]*?)<\/script>/i,
-  /<script[^>]*type="application\/ld\+json"[^>]*>([\s\S]*?)<\/script>/i,
-  /window\.__INITIAL_STATE__\s*=\s*(\{[\s\S]*?\});?\s*<\/script>/i,
-];
+/**
+ * Every script tag on the page, in one pass. A product page is several hundred
+ * kB of HTML; one scan that sorts each tag by its attributes reads it once,
+ * where a pattern per kind of state read it three times over. Only the opening
+ * tag is a pattern: the body runs to the next `</script>`, and finding that is
+ * a plain substring search (see `scriptEnd`) instead of a lazy `[\s\S]*?` that
+ * tries the closing tag at every character of a multi-megabyte blob.
+ */
+const SCRIPT_OPEN = /<script\b([^>]*)>/gi;
+const NEXT_DATA_ATTR = /id="__NEXT_DATA__"/i;
+const LD_JSON_ATTR = /type="application\/ld\+json"/i;
+const INITIAL_STATE = /window\.__INITIAL_STATE__\s*=\s*(\{[\s\S]*\});?\s*$/;
+const FLIGHT_PUSH = /self\.__next_f\.push\(\s*\[\s*\d+\s*,\s*("(?:[^"\\]|\\.)*")/g;
 
 /**
  * Returns every JSON blob embedded in the page. Callers search the result rather
- * than indexing into it, so an extra or missing blob is harmless.
+ * than indexing into it, so an extra or missing blob is harmless. The order is
+ * still fixed — Next.js state first, then ld+json, then the legacy initial
+ * state — because a search returns the first hit.
  */
 export function extractEmbeddedJson(html: string): unknown[] {
-  const out: unknown[] = [...extractFlightJson(html)];
-  for (const re of STATE_SCRIPTS) {
-    // Match every occurrence, not just the first — ld+json appears many times.
-    const global = new RegExp(re.source, re.flags.includes("g") ? re.flags : re.flags + "g");
-    for (const match of html.matchAll(global)) {
-      const raw = match[1];
-      if (!raw) continue;
-      try {
-        out.push(JSON.parse(raw.trim()));
-      } catch {
-        // A blob we can't parse is simply not a source of recipes.
-      }
+  const flight: string[] = [];
+  const nextData: string[] = [];
+  const ldJson: string[] = [];
+  const initialState: string[] = [];
+  // Every occurrence, not just the first — ld+json appears many times.
+  for (const { attrs, body } of scriptTags(html)) {
+    if (!body) continue;
+    // De flight-chunks staan ook in script-tags: die zoeken we alleen in de
+    // tags waar ze in staan, niet nog een keer over de hele pagina.
+    if (body.includes("self.__next_f")) flight.push(body);
+    if (NEXT_DATA_ATTR.test(attrs)) nextData.push(body);
+    if (LD_JSON_ATTR.test(attrs)) ldJson.push(body);
+    const state = body.includes("__INITIAL_STATE__") ? INITIAL_STATE.exec(body)?.[1] : undefined;
+    if (state) initialState.push(state);
+  }
+
+  const out: unknown[] = flightJson(flight);
+  for (const raw of [...nextData, ...ldJson, ...initialState]) {
+    try {
+      out.push(JSON.parse(trimEdges(raw)));
+    } catch {
+      // A blob we can't parse is simply not a source of recipes.
     }
   }
   return out;
 }
 
+const EDGE_SPACE = /\s/;
+
+/**
+ * `trim()`, maar alleen als er aan een van de uiteinden iets te halen valt.
+ * JSON.parse slaat zelf alleen JSON-witruimte over (spatie, tab, CR, LF), niet
+ * een BOM, NBSP of U+2028/2029; die moeten er dus wel af. Een gewone blob
+ * begint met `{` en eindigt met `}`, en dan wordt een __NEXT_DATA__ van een
+ * paar megabyte niet voor niets gekopieerd.
+ */
+function trimEdges(raw: string): string {
+  return EDGE_SPACE.test(raw.charAt(0)) || EDGE_SPACE.test(raw.charAt(raw.length - 1)) ? raw.trim() : raw;
+}
+
+/** De script-tags van een pagina in volgorde, als attributen en inhoud. */
+function* scriptTags(html: string): Generator<{ attrs: string; body: string }> {
+  // Een eigen kopie: de gedeelde constante houdt met /g een positie bij.
+  const open = new RegExp(SCRIPT_OPEN);
+  for (let match = open.exec(html); match; match = open.exec(html)) {
+    const start = open.lastIndex;
+    const end = scriptEnd(html, start);
+    if (end < 0) return;
+    yield { attrs: match[1]!, body: html.slice(start, end) };
+    open.lastIndex = end + "</script>".length;
+  }
+}
+
+/**
+ * Waar de eerstvolgende `</script>` begint, hoofdletterongevoelig zoals de
+ * browser, of -1. `indexOf` op "</" springt door de lange stukken zonder tag
+ * heen; pas daar wordt gekeken of het een sluitende script-tag is.
+ */
+function scriptEnd(html: string, from: number): number {
+  for (let i = html.indexOf("</", from); i >= 0; i = html.indexOf("</", i + 2)) {
+    if (html[i + 8] === ">" && html.slice(i + 2, i + 8).toLowerCase() === "script") return i;
+  }
+  return -1;
+}
+
 /**
  * De App Router van Next.js zet de paginastate niet in één script-tag maar in een
  * reeks `self.__next_f.push([1, "..."])`-aanroepen die samen één stream vormen.
@@ -42,14 +99,19 @@ export function extractEmbeddedJson(html: string): unknown[] {
  * geen bron van recepten.
  */
 export function extractFlightJson(html: string): unknown[] {
+  return flightJson([html]);
+}
+
+/** De flight-stream uit de stukken tekst waarin de `push`-aanroepen staan, in volgorde. */
+function flightJson(sources: string[]): unknown[] {
   let stream = "";
-  for (const match of html.matchAll(
-    /self\.__next_f\.push\(\s*\[\s*\d+\s*,\s*("(?:[^"\\]|\\.)*")/g,
-  )) {
-    try {
-      stream += JSON.parse(match[1]!) as string;
-    } catch {
-      // Een chunk die geen geldige string-literal is, slaan we over.
+  for (const source of sources) {
+    for (const match of source.matchAll(FLIGHT_PUSH)) {
+      try {
+        stream += JSON.parse(match[1]!) as string;
+      } catch {
+        // Een chunk die geen geldige string-literal is, slaan we over.
+      }
     }
   }
   if (stream === "") return [];
@@ -70,12 +132,15 @@ export function extractFlightJson(html: string): unknown[] {
   return out;
 }
 
-function rowStarts(stream: string): number[] {
-  const starts: number[] = [];
+/**
+ * Waar de regels beginnen, één voor één in plaats van als lijst vooraf: een
+ * grote pagina heeft duizenden regels, en elke regel is al verwerkt voordat de
+ * volgende gezocht wordt.
+ */
+function* rowStarts(stream: string): Generator<number> {
   for (const match of stream.matchAll(/(?:^|\n)[0-9a-f]+:[A-Za-z]?(?=[[{])/g)) {
-    starts.push(match.index! + match[0].length);
+    yield match.index! + match[0].length;
   }
-  return starts;
 }
 
 /** Leest vanaf `start` één gebalanceerd JSON-object of -array, of null. */
@@ -1,6 +1,6 @@
 import type { RawScrape } from "../ah/client";
 import type { Nutrients, Product, RawIngredient, Recipe } from "../ah/types";
-import { deriveTags, forbiddenTags } from "../nutrition/diet";
+import { deriveTags, dietMask, forbiddenMask } from "../nutrition/diet";
 import type { ProductMatch } from "../nutrition/resolve";
 import { DEFAULT_SLOTS, type MealSlot } from "../nutrition/split";
 import { DEFAULT_PROFILE, sanitiseProfile, type Profile } from "../nutrition/targets";
@@ -22,6 +22,69 @@ const MATCH_TTL_MS = 30 * 24 * 60 * 60 * 1000;
  */
 const SKIP_TTL_MS = 14 * 24 * 60 * 60 * 1000;
 
+/**
+ * De upserts staan als constante tekst klaar: de statement-caches van D1 en van
+ * de lokale adapter herkennen een statement aan zijn tekst, dus elke aanroep
+ * treft hetzelfde, al gecompileerde statement.
+ */
+const PUT_RECIPE_SQL = `INSERT INTO recipes (id, title, url, servings, image_url, ingredients, fetched_at, first_seen_at, tags, keywords, nutrition_per_serving, diet_mask, ingredient_count)
+   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+   ON CONFLICT(id) DO UPDATE SET
+     -- "Heeft deze scrape ingredienten" staat als getal in ingredient_count; de
+     -- JSON hoeft daarvoor niet voor elke kolom opnieuw geparsed te worden.
+     title = excluded.title,
+     url = excluded.url,
+     servings = excluded.servings,
+     image_url = COALESCE(excluded.image_url, recipes.image_url),
+     ingredients = CASE
+       WHEN excluded.ingredient_count > 0 THEN excluded.ingredients
+       ELSE recipes.ingredients
+     END,
+     tags = CASE
+       WHEN excluded.ingredient_count > 0 THEN excluded.tags
+       ELSE recipes.tags
+     END,
+     -- Hoort bij tags en volgt dus dezelfde regel.
+     diet_mask = CASE
+       WHEN excluded.ingredient_count > 0 THEN excluded.diet_mask
+       ELSE recipes.diet_mask
+     END,
+     ingredient_count = CASE
+       WHEN excluded.ingredient_count > 0 THEN excluded.ingredient_count
+       ELSE recipes.ingredient_count
+     END,
+     -- putRecipe schrijft altijd JSON.stringify van een array: leeg is dus '[]'.
+     keywords = CASE
+       WHEN excluded.keywords <> '[]' THEN excluded.keywords
+       ELSE recipes.keywords
+     END,
+     -- Een herscrape zonder voedingswaarde mag een eerder gevonden blok
+     -- niet wegvagen; dat is dezelfde regel als voor de ingredienten.
+     nutrition_per_serving = COALESCE(excluded.nutrition_per_serving, recipes.nutrition_per_serving),
+     fetched_at = excluded.fetched_at,
+     first_seen_at = COALESCE(recipes.first_seen_at, excluded.first_seen_at)`;
+
+// Kop en staart apart, zodat `insertRows` er een upsert met meerdere rijen
+// van kan maken; de losse variant is dezelfde SQL met één rij ertussen.
+const PRODUCT_INSERT = "INSERT INTO products (webshop_id, title, sales_unit_size, per_100g, fetched_at)";
+const PRODUCT_UPSERT = `
+   ON CONFLICT(webshop_id) DO UPDATE SET
+     title = excluded.title,
+     sales_unit_size = excluded.sales_unit_size,
+     per_100g = excluded.per_100g,
+     fetched_at = excluded.fetched_at`;
+const PUT_PRODUCT_SQL = `${PRODUCT_INSERT}
+   VALUES (?, ?, ?, ?, ?)${PRODUCT_UPSERT}`;
+
+const MATCH_INSERT = "INSERT INTO ingredient_matches (ingredient_name, webshop_id, score, matched_at)";
+const MATCH_UPSERT = `
+   ON CONFLICT(ingredient_name) DO UPDATE SET
+     webshop_id = excluded.webshop_id,
+     score = excluded.score,
+     matched_at = excluded.matched_at`;
+const PUT_MATCH_SQL = `${MATCH_INSERT}
+   VALUES (?, ?, ?, ?)${MATCH_UPSERT}`;
+
 export interface RecipeSummary {
   id: string;
   title: string;
@@ -37,6 +100,22 @@ export interface RecipeSummary {
 
 export type LogLevel = "info" | "warn" | "error";
 
+/** Een logregel die met een schrijfactie mee kan, in dezelfde batch. */
+export interface LogEntry {
+  level: LogLevel;
+  source: string;
+  message: string;
+  detail?: Record<string, unknown>;
+}
+
+/**
+ * Eén recept in een bulkronde: compleet opslaan, of afkeuren met een reden.
+ * Zo gaat een hele reeks in één batch in plaats van één batch per recept.
+ */
+export type RecipeWrite =
+  | { recipe: Recipe; total: Nutrients; entry?: LogEntry }
+  | { skip: string; reason: string; entry?: LogEntry };
+
 export interface LogRow {
   id: number;
   at: number;
@@ -56,32 +135,27 @@ export class Store {
 
   async getRecipe(id: string): Promise<Recipe | null> {
     const row = await this.db
-      .prepare("SELECT * FROM recipes WHERE id = ?")
+      .prepare(`SELECT ${RECIPE_COLUMNS} FROM recipes WHERE id = ?`)
       .bind(id)
-      .first<{
-        id: string;
-        title: string;
-        url: string;
-        servings: number;
-        image_url: string | null;
-        ingredients: string;
-        keywords: string | null;
-        nutrition_per_serving: string | null;
-      }>();
-    if (!row) return null;
-    return {
-      id: row.id,
-      title: row.title,
-      url: row.url,
-      servings: row.servings,
-      imageUrl: row.image_url,
-      ingredients: JSON.parse(row.ingredients) as RawIngredient[],
-      keywords: parseJson<string[]>(row.keywords, []),
-      // Zonder dit zou het plannen (dat alleen uit de database leest) de gaten
-      // niet meer kunnen vullen die het scrapen wél gevuld had, en een recept
-      // ineens veel te weinig calorieen tellen.
-      nutritionPerServing: parseJson<Nutrients | null>(row.nutrition_per_serving, null),
-    };
+      .first<RecipeDbRow>();
+    return row ? toRecipe(row) : null;
+  }
+
+  /**
+   * Dezelfde recepten als `getRecipe`, voor een hele reeks ids in één query per
+   * stuk van `MAX_IN_PARAMS` in plaats van één rondje naar D1 per kandidaat.
+   * Een id dat niet bestaat staat niet in de map.
+   */
+  async getRecipes(ids: string[]): Promise<Map<string, Recipe>> {
+    const out = new Map<string, Recipe>();
+    for (const chunk of inChunks(ids)) {
+      const { results } = await this.db
+        .prepare(`SELECT ${RECIPE_COLUMNS} FROM recipes WHERE id IN (${holes(chunk.length)})`)
+        .bind(...chunk)
+        .all<RecipeDbRow>();
+      for (const row of results ?? []) out.set(row.id, toRecipe(row));
+    }
+    return out;
   }
 
   /**
@@ -91,34 +165,29 @@ export class Store {
    * en `first_seen_at` blijft staan zodra het een keer gezet is.
    */
   async putRecipe(recipe: Recipe): Promise<void> {
+    await this.recipeStatement(recipe).run();
+  }
+
+  /**
+   * Een compleet recept: het recept en AH's voedingswaarde in één batch. Dat is
+   * één ronde naar D1 in plaats van twee, en één transactie, dus een recept
+   * zonder voedingsrij kan er ook niet half in blijven staan. De logregel erover
+   * kan in dezelfde batch mee. Alle rijen krijgen hetzelfde tijdstip: ze horen
+   * bij één schrijfactie.
+   */
+  async putCompleteRecipe(recipe: Recipe, total: Nutrients, entry?: LogEntry): Promise<void> {
     const now = Date.now();
-    await this.db
-      .prepare(
-        `INSERT INTO recipes (id, title, url, servings, image_url, ingredients, fetched_at, first_seen_at, tags, keywords, nutrition_per_serving)
-         VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-         ON CONFLICT(id) DO UPDATE SET
-           title = excluded.title,
-           url = excluded.url,
-           servings = excluded.servings,
-           image_url = COALESCE(excluded.image_url, recipes.image_url),
-           ingredients = CASE
-             WHEN json_array_length(excluded.ingredients) > 0 THEN excluded.ingredients
-             ELSE recipes.ingredients
-           END,
-           tags = CASE
-             WHEN json_array_length(excluded.ingredients) > 0 THEN excluded.tags
-             ELSE recipes.tags
-           END,
-           keywords = CASE
-             WHEN json_array_length(excluded.keywords) > 0 THEN excluded.keywords
-             ELSE recipes.keywords
-           END,
-           -- Een herscrape zonder voedingswaarde mag een eerder gevonden blok
-           -- niet wegvagen; dat is dezelfde regel als voor de ingredienten.
-           nutrition_per_serving = COALESCE(excluded.nutrition_per_serving, recipes.nutrition_per_serving),
-           fetched_at = excluded.fetched_at,
-           first_seen_at = COALESCE(recipes.first_seen_at, excluded.first_seen_at)`,
-      )
+    await this.db.batch([
+      this.recipeStatement(recipe, now),
+      this.nutritionStatement(recipe.id, total, 1, "ah", now),
+      ...this.logStatements(entry, now),
+    ]);
+  }
+
+  private recipeStatement(recipe: Recipe, now = Date.now()): D1PreparedStatement {
+    const tags = deriveTags(recipe);
+    return this.db
+      .prepare(PUT_RECIPE_SQL)
       .bind(
         recipe.id,
         recipe.title,
@@ -128,11 +197,12 @@ export class Store {
         JSON.stringify(recipe.ingredients),
         now,
         now,
-        JSON.stringify(deriveTags(recipe)),
+        JSON.stringify(tags),
         JSON.stringify(recipe.keywords ?? []),
         recipe.nutritionPerServing ? JSON.stringify(recipe.nutritionPerServing) : null,
-      )
-      .run();
+        dietMask(tags),
+        recipe.ingredients.length,
+      );
   }
 
   /** Alle recept-ids die we kennen, ongeacht TTL. Voor onderhoudstaken. */
@@ -149,33 +219,82 @@ export class Store {
    * Legt een ruwe scrape vast. De sleutel bevat het tijdstip, dus elke scrape
    * komt er als eigen rij bij: dit is een archief, geen cache. Een mislukte
    * insert mag de aanroeper nooit raken — archiveren gebeurt tijdens het scrapen.
+   *
+   * Eén uitzondering: is een geslaagde payload byte voor byte gelijk aan de
+   * nieuwste voor dezelfde referentie, dan komt er geen rij bij. Een zoekpagina
+   * die elke rotatie hetzelfde antwoord geeft, zou het archief anders met
+   * identieke kopieën vullen die reparse toch nooit anders leest. Mislukte
+   * verzoeken blijven er altijd bij: elke poging telt daar.
    */
   async putRaw(raw: RawScrape, parsedOk = false, parseError: string | null = null): Promise<void> {
-    const at = Date.now();
     try {
-      await this.db
-        .prepare(
-          `INSERT INTO scrape_raw (id, kind, ref, url, status, body, parsed_ok, parse_error, scraped_at)
-           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-           ON CONFLICT(id) DO NOTHING`,
-        )
-        .bind(
-          `${raw.kind}:${raw.ref}:${at}`,
-          raw.kind,
-          raw.ref,
-          raw.url,
-          raw.status,
-          raw.body,
-          parsedOk ? 1 : 0,
-          parseError,
-          at,
-        )
-        .run();
+      await this.rawStatement(raw, parsedOk, parseError).run();
     } catch {
       // opslag van het archief mag een lopende scrape niet laten mislukken
     }
   }
 
+  /**
+   * Legt één opgehaalde pagina vast: de logregel en, als `archive` aanstaat, de
+   * ruwe payload. Dit gebeurt na elk verzoek aan ah.nl, dus het is de drukste
+   * schrijfactie van een ronde; samen in één batch is dat één D1-rondgang en één
+   * transactie per pagina in plaats van twee. Valt de batch om, dan wordt de
+   * logregel los nog geprobeerd — die is juist bij problemen nodig. Net als
+   * `putRaw` en `log` raakt een fout de aanroeper nooit.
+   */
+  async recordFetch(
+    raw: RawScrape,
+    archive: boolean,
+    level: LogLevel,
+    message: string,
+    detail?: Record<string, unknown>,
+  ): Promise<void> {
+    try {
+      const at = Date.now();
+      const line = this.logStatement(level, "ah", message, detail, at);
+      await this.db.batch(archive ? [this.rawStatement(raw, false, null, at), line] : [line]);
+    } catch {
+      if (archive) await this.log(level, "ah", message, detail);
+    }
+  }
+
+  private rawStatement(
+    raw: RawScrape,
+    parsedOk: boolean,
+    parseError: string | null,
+    at = Date.now(),
+  ): D1PreparedStatement {
+    return this.db
+      .prepare(
+        `WITH incoming(body) AS (VALUES (?))
+         INSERT INTO scrape_raw (id, kind, ref, url, status, body, parsed_ok, parse_error, scraped_at)
+         SELECT ?, ?, ?, ?, ?, incoming.body, ?, ?, ? FROM incoming
+         WHERE ? >= 400 OR NOT EXISTS (
+           SELECT 1 FROM scrape_raw latest
+           WHERE latest.id = (
+             SELECT id FROM scrape_raw WHERE kind = ? AND ref = ? ORDER BY scraped_at DESC LIMIT 1
+           )
+           AND latest.status = ? AND latest.body = incoming.body
+         )
+         ON CONFLICT(id) DO NOTHING`,
+      )
+      .bind(
+        raw.body,
+        `${raw.kind}:${raw.ref}:${at}`,
+        raw.kind,
+        raw.ref,
+        raw.url,
+        raw.status,
+        parsedOk ? 1 : 0,
+        parseError,
+        at,
+        raw.status,
+        raw.kind,
+        raw.ref,
+        raw.status,
+      );
+  }
+
   /** De nieuwste ruwe payload voor een referentie, om opnieuw te parsen. */
   async latestRaw(kind: string, ref: string): Promise<{ body: string; url: string } | null> {
     return await this.db
@@ -194,9 +313,25 @@ export class Store {
     kind: string,
     limit: number,
   ): Promise<{ id: string; ref: string; body: string }[]> {
+    const rows: { id: string; ref: string; body: string }[] = [];
+    for await (const row of this.eachLatestRaw(kind, limit)) rows.push(row);
+    return rows;
+  }
+
+  /**
+   * Als latestRawPerRef, maar de payloads komen per pagina binnen in plaats van
+   * allemaal tegelijk. Eén pagina kan megabytes zijn en een Worker heeft 128 MB:
+   * tweehonderd bodies in één resultaat is precies hoe je die grens raakt.
+   * Eerst alleen de ids (klein), daarna de bodies in stukjes van `pageSize`.
+   */
+  async *eachLatestRaw(
+    kind: string,
+    limit: number,
+    pageSize = RAW_PAGE_SIZE,
+  ): AsyncGenerator<{ id: string; ref: string; body: string }> {
     const { results } = await this.db
       .prepare(
-        `SELECT id, ref, body FROM scrape_raw
+        `SELECT id, ref FROM scrape_raw
          WHERE kind = ? AND scraped_at = (
            SELECT MAX(scraped_at) FROM scrape_raw inner_raw
            WHERE inner_raw.kind = scrape_raw.kind AND inner_raw.ref = scrape_raw.ref
@@ -205,15 +340,30 @@ export class Store {
          LIMIT ?`,
       )
       .bind(kind, limit)
-      .all<{ id: string; ref: string; body: string }>();
-    return results ?? [];
+      .all<{ id: string; ref: string }>();
+
+    for (const page of inChunks(results ?? [], pageSize)) {
+      const { results: bodies } = await this.db
+        .prepare(`SELECT id, body FROM scrape_raw WHERE id IN (${holes(page.length)})`)
+        .bind(...page.map((r) => r.id))
+        .all<{ id: string; body: string }>();
+      const byId = new Map((bodies ?? []).map((b) => [b.id, b.body]));
+      for (const row of page) {
+        const body = byId.get(row.id);
+        if (body !== undefined) yield { id: row.id, ref: row.ref, body };
+      }
+    }
   }
 
   async markRawParsed(id: string, ok: boolean, error: string | null = null): Promise<void> {
-    await this.db
-      .prepare("UPDATE scrape_raw SET parsed_ok = ?, parse_error = ? WHERE id = ?")
-      .bind(ok ? 1 : 0, error, id)
-      .run();
+    await this.markRawParsedMany([{ id, ok, error }]);
+  }
+
+  /** Als markRawParsed, voor een hele reparse-ronde in één batch. */
+  async markRawParsedMany(marks: { id: string; ok: boolean; error: string | null }[]): Promise<void> {
+    if (marks.length === 0) return;
+    const statement = this.db.prepare("UPDATE scrape_raw SET parsed_ok = ?, parse_error = ? WHERE id = ?");
+    await this.db.batch(marks.map((m) => statement.bind(m.ok ? 1 : 0, m.error, m.id)));
   }
 
   async countRaw(): Promise<{ total: number; unparsed: number }> {
@@ -229,7 +379,7 @@ export class Store {
 
   async getProduct(webshopId: string): Promise<Product | null> {
     const row = await this.db
-      .prepare("SELECT * FROM products WHERE webshop_id = ?")
+      .prepare("SELECT webshop_id, title, sales_unit_size, per_100g FROM products WHERE webshop_id = ?")
       .bind(webshopId)
       .first<{
         webshop_id: string;
@@ -247,24 +397,41 @@ export class Store {
   }
 
   async putProduct(product: Product): Promise<void> {
-    await this.db
-      .prepare(
-        `INSERT INTO products (webshop_id, title, sales_unit_size, per_100g, fetched_at)
-         VALUES (?, ?, ?, ?, ?)
-         ON CONFLICT(webshop_id) DO UPDATE SET
-           title = excluded.title,
-           sales_unit_size = excluded.sales_unit_size,
-           per_100g = excluded.per_100g,
-           fetched_at = excluded.fetched_at`,
-      )
-      .bind(
-        product.webshopId,
-        product.title,
-        product.salesUnitSize,
-        JSON.stringify(product.per100g),
-        Date.now(),
-      )
-      .run();
+    await this.putProducts([product]);
+  }
+
+  /**
+   * Een hele reeks producten als upsert met meerdere rijen: een paar statements
+   * in plaats van één per product. Komt een id twee keer voor, dan wint net als
+   * vroeger de laatste.
+   */
+  async putProducts(products: Product[]): Promise<void> {
+    if (products.length === 0) return;
+    await this.db.batch(this.productStatements(products, Date.now()));
+  }
+
+  /**
+   * Producten en de koppelingen ernaar in één transactie: een verrijkt recept
+   * kost zo één commit in plaats van één per tabel. Een koppeling mag naar een
+   * product wijzen dat er (nog) niet staat — mislukte het ophalen, dan blijft
+   * de koppeling op naam toch staan en komt het product een volgende keer.
+   */
+  async putProductsAndMatches(
+    products: Product[],
+    matches: { ingredientName: string; webshopId: string | null; score: number }[],
+  ): Promise<void> {
+    const now = Date.now();
+    const statements = [...this.productStatements(products, now), ...this.matchStatements(matches, now)];
+    if (statements.length === 0) return;
+    await this.db.batch(statements);
+  }
+
+  private productStatements(products: Product[], now: number): D1PreparedStatement[] {
+    return this.insertRows(
+      PRODUCT_INSERT,
+      products.map((p) => [p.webshopId, p.title, p.salesUnitSize, JSON.stringify(p.per100g), now]),
+      PRODUCT_UPSERT,
+    );
   }
 
   /**
@@ -282,7 +449,7 @@ export class Store {
       const { results } = await this.db
         .prepare(
           `SELECT webshop_id, title, sales_unit_size FROM products
-           WHERE webshop_id IN (${chunk.map(() => "?").join(", ")})`,
+           WHERE webshop_id IN (${holes(chunk.length)})`,
         )
         .bind(...chunk)
         .all<{ webshop_id: string; title: string; sales_unit_size: string | null }>();
@@ -314,17 +481,26 @@ export class Store {
   }
 
   async putMatch(ingredientName: string, webshopId: string | null, score: number): Promise<void> {
-    await this.db
-      .prepare(
-        `INSERT INTO ingredient_matches (ingredient_name, webshop_id, score, matched_at)
-         VALUES (?, ?, ?, ?)
-         ON CONFLICT(ingredient_name) DO UPDATE SET
-           webshop_id = excluded.webshop_id,
-           score = excluded.score,
-           matched_at = excluded.matched_at`,
-      )
-      .bind(ingredientName, webshopId, score, Date.now())
-      .run();
+    await this.putMatches([{ ingredientName, webshopId, score }]);
+  }
+
+  /** Zoals `putProducts`: alle koppelingen van een recept in één batch. */
+  async putMatches(
+    matches: { ingredientName: string; webshopId: string | null; score: number }[],
+  ): Promise<void> {
+    if (matches.length === 0) return;
+    await this.db.batch(this.matchStatements(matches, Date.now()));
+  }
+
+  private matchStatements(
+    matches: { ingredientName: string; webshopId: string | null; score: number }[],
+    now: number,
+  ): D1PreparedStatement[] {
+    return this.insertRows(
+      MATCH_INSERT,
+      matches.map((m) => [m.ingredientName, m.webshopId, m.score, now]),
+      MATCH_UPSERT,
+    );
   }
 
   /**
@@ -341,7 +517,7 @@ export class Store {
       const { results } = await this.db
         .prepare(
           `SELECT ingredient_name, webshop_id FROM ingredient_matches
-           WHERE webshop_id IS NOT NULL AND ingredient_name IN (${chunk.map(() => "?").join(", ")})`,
+           WHERE webshop_id IS NOT NULL AND ingredient_name IN (${holes(chunk.length)})`,
         )
         .bind(...chunk)
         .all<{ ingredient_name: string; webshop_id: string }>();
@@ -350,6 +526,18 @@ export class Store {
     return out;
   }
 
+  /**
+   * Alle ingredientnamen met een productkoppeling, in één query. Voor wie per
+   * ronde honderden recepten langsloopt: één keer ophalen en in het geheugen
+   * controleren in plaats van een `matchMap` per recept.
+   */
+  async linkedIngredientNames(): Promise<Set<string>> {
+    const { results } = await this.db
+      .prepare("SELECT ingredient_name FROM ingredient_matches WHERE webshop_id IS NOT NULL")
+      .all<{ ingredient_name: string }>();
+    return new Set((results ?? []).map((r) => r.ingredient_name));
+  }
+
   /**
    * De onthouden productkoppelingen mét voedingswaarden voor een reeks
    * ingredientnamen. Waar `matchMap` alleen de webshop-ids geeft, levert dit de
@@ -368,7 +556,7 @@ export class Store {
           `SELECT m.ingredient_name, m.score, p.webshop_id, p.title, p.sales_unit_size, p.per_100g
            FROM ingredient_matches m
            JOIN products p ON p.webshop_id = m.webshop_id
-           WHERE m.ingredient_name IN (${chunk.map(() => "?").join(", ")})`,
+           WHERE m.ingredient_name IN (${holes(chunk.length)})`,
         )
         .bind(...chunk)
         .all<{
@@ -394,9 +582,19 @@ export class Store {
     return out;
   }
 
-  /** Lets the UI correct a bad automatic match; corrections outlive the TTL sweep. */
-  async overrideMatch(ingredientName: string, webshopId: string): Promise<void> {
-    await this.putMatch(ingredientName, webshopId, 1);
+  /**
+   * Lets the UI correct a bad automatic match; corrections outlive the TTL sweep.
+   * Het product en de koppeling gaan samen in één batch, zodat een koppeling
+   * nooit naar een product wijst dat er (nog) niet staat.
+   */
+  async overrideMatch(ingredientName: string, product: Product): Promise<void> {
+    const now = Date.now();
+    await this.db.batch([
+      this.db
+        .prepare(PUT_PRODUCT_SQL)
+        .bind(product.webshopId, product.title, product.salesUnitSize, JSON.stringify(product.per100g), now),
+      this.db.prepare(PUT_MATCH_SQL).bind(ingredientName, product.webshopId, 1, now),
+    ]);
   }
 
   // -------------------------------------------------------------- nutrition
@@ -412,7 +610,17 @@ export class Store {
     coverage: number,
     source: "ah" | "products" = "products",
   ): Promise<void> {
-    await this.db
+    await this.nutritionStatement(recipeId, n, coverage, source).run();
+  }
+
+  private nutritionStatement(
+    recipeId: string,
+    n: Nutrients,
+    coverage: number,
+    source: "ah" | "products",
+    now = Date.now(),
+  ): D1PreparedStatement {
+    return this.db
       .prepare(
         `INSERT INTO recipe_nutrition (recipe_id, kcal, protein, carbs, fat, fiber, coverage, computed_at, source)
          VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
@@ -430,15 +638,15 @@ export class Store {
         n.fat ?? 0,
         n.fiber ?? 0,
         coverage,
-        Date.now(),
+        now,
         source,
-      )
-      .run();
+      );
   }
 
   /**
    * Shortlists cached recipes for a target. Ordering by protein density rather
    * than raw protein keeps 3000 kcal party dishes out of a 700 kcal dinner slot.
+   * The WHERE and ORDER BY mirror idx_recipe_nutrition_density; keep them in step.
    */
   async shortlist(limit: number, minCoverage = 0.5): Promise<RecipeSummary[]> {
     const { results } = await this.db
@@ -485,18 +693,29 @@ export class Store {
       params.push(kcalPerPortion * 0.35, kcalPerPortion * 2.5);
     }
 
-    for (const tag of forbiddenTags(diet)) {
+    // Eén bitvergelijking voor het hele dieet in plaats van een LIKE over de
+    // tags-JSON per verboden label. Een label zonder bit valt terug op die LIKE.
+    const forbidden = forbiddenMask(diet);
+    if (forbidden.mask !== 0) {
+      conditions.push("(r.diet_mask & ?) = 0");
+      params.push(forbidden.mask);
+    }
+    for (const tag of forbidden.rest) {
       conditions.push("COALESCE(r.tags, '[]') NOT LIKE ?");
       params.push(`%"${tag}"%`);
     }
 
+    // LIKE vergelijkt al zonder op hoofdletters te letten, net zo ver als LOWER()
+    // dat doet (alleen ASCII). LOWER(r.ingredients) maakte per term per rij een
+    // kopie van de hele ingrediëntenlijst voor een vergelijking die hetzelfde
+    // uitkomt.
     for (const term of excludedTerms) {
-      conditions.push("LOWER(r.ingredients) NOT LIKE ?");
+      conditions.push("r.ingredients NOT LIKE ?");
       params.push(`%${term.toLowerCase()}%`);
     }
 
     if (excludeRecipeIds.length > 0) {
-      conditions.push(`r.id NOT IN (${excludeRecipeIds.map(() => "?").join(", ")})`);
+      conditions.push(`r.id NOT IN (${holes(excludeRecipeIds.length)})`);
       params.push(...excludeRecipeIds);
     }
 
@@ -569,15 +788,71 @@ export class Store {
     return row !== null;
   }
 
-  /** Legt vast waaróp een recept sneuvelde, zodat we het nooit opnieuw ophalen. */
-  async skipRecipe(id: string, reason: string): Promise<void> {
-    await this.db
+  /**
+   * `isKnownRecipe` voor een hele zoekpagina tegelijk: de ids die we niet
+   * hoeven op te halen. Eén query per stuk van de IN-lijst in plaats van één
+   * per recept, zodat de ronde niet tientallen keren op D1 wacht voordat het
+   * eerste verzoek aan ah.nl de deur uit gaat.
+   */
+  async knownRecipeIds(ids: string[]): Promise<Set<string>> {
+    const out = new Set<string>();
+    const freshSince = Date.now() - SKIP_TTL_MS;
+    // De lijst staat twee keer in de query, dus de helft per stuk.
+    for (const chunk of inChunks([...new Set(ids)], Math.floor(MAX_IN_PARAMS / 2))) {
+      const list = holes(chunk.length);
+      const { results } = await this.db
+        .prepare(
+          `SELECT id FROM recipes WHERE id IN (${list})
+           UNION
+           SELECT id FROM skipped_recipes WHERE id IN (${list}) AND at > ?`,
+        )
+        .bind(...chunk, ...chunk, freshSince)
+        .all<{ id: string }>();
+      for (const row of results ?? []) out.add(row.id);
+    }
+    return out;
+  }
+
+  /**
+   * Legt vast waaróp een recept sneuvelde, zodat we het nooit opnieuw ophalen.
+   * Met een logregel erbij gaan beide in één batch.
+   */
+  async skipRecipe(id: string, reason: string, entry?: LogEntry): Promise<void> {
+    const now = Date.now();
+    const skip = this.skipStatement(id, reason, now);
+    if (entry) await this.db.batch([skip, ...this.logStatements(entry, now)]);
+    else await skip.run();
+  }
+
+  /**
+   * Een reeks recepten tegelijk opslaan of afkeuren, zoals putCompleteRecipe en
+   * skipRecipe per stuk doen, maar in één batch en dus één transactie, met
+   * één tijdstip voor de hele ronde.
+   */
+  async putRecipeWrites(writes: RecipeWrite[]): Promise<void> {
+    if (writes.length === 0) return;
+    const now = Date.now();
+    const statements: D1PreparedStatement[] = [];
+    for (const write of writes) {
+      if ("skip" in write) statements.push(this.skipStatement(write.skip, write.reason, now));
+      else {
+        statements.push(
+          this.recipeStatement(write.recipe, now),
+          this.nutritionStatement(write.recipe.id, write.total, 1, "ah", now),
+        );
+      }
+      statements.push(...this.logStatements(write.entry, now));
+    }
+    await this.db.batch(statements);
+  }
+
+  private skipStatement(id: string, reason: string, now: number): D1PreparedStatement {
+    return this.db
       .prepare(
         `INSERT INTO skipped_recipes (id, reason, at) VALUES (?, ?, ?)
          ON CONFLICT(id) DO UPDATE SET reason = excluded.reason, at = excluded.at`,
       )
-      .bind(id, reason, Date.now())
-      .run();
+      .bind(id, reason, now);
   }
 
   /**
@@ -589,7 +864,7 @@ export class Store {
   async dropIncompleteRecipes(): Promise<number> {
     const ids = `SELECT r.id FROM recipes r
        LEFT JOIN recipe_nutrition n ON n.recipe_id = r.id
-       WHERE (json_array_length(r.ingredients) = 0 OR COALESCE(n.kcal, 0) <= 0)
+       WHERE (r.ingredient_count = 0 OR COALESCE(n.kcal, 0) <= 0)
          AND NOT EXISTS (SELECT 1 FROM saved_day_meals sm WHERE sm.recipe_id = r.id)
          AND NOT EXISTS (SELECT 1 FROM recipe_prefs rp WHERE rp.recipe_id = r.id AND rp.status = 'fav')`;
     const { results } = await this.db.prepare(ids).all<{ id: string }>();
@@ -598,14 +873,17 @@ export class Store {
 
     // Een grote opruiming kan honderden recepten tegelijk wissen; ook hier
     // geldt D1's parameter-limiet, dus de IN-lijsten worden in stukken gedaan.
+    // Alle stukken samen gaan in één batch: één transactie, en geen recept dat
+    // zijn voedingswaarde kwijt is maar zelf nog bestaat als er iets misgaat.
+    const deletes: D1PreparedStatement[] = [];
     for (const chunk of inChunks(doomed)) {
-      const holes = chunk.map(() => "?").join(", ");
-      await this.db
-        .prepare(`DELETE FROM recipe_nutrition WHERE recipe_id IN (${holes})`)
-        .bind(...chunk)
-        .run();
-      await this.db.prepare(`DELETE FROM recipes WHERE id IN (${holes})`).bind(...chunk).run();
+      const list = holes(chunk.length);
+      deletes.push(
+        this.db.prepare(`DELETE FROM recipe_nutrition WHERE recipe_id IN (${list})`).bind(...chunk),
+        this.db.prepare(`DELETE FROM recipes WHERE id IN (${list})`).bind(...chunk),
+      );
     }
+    await this.db.batch(deletes);
     return doomed.length;
   }
 
@@ -636,7 +914,7 @@ export class Store {
     const { results } = await this.db
       .prepare(
         `SELECT r.id, r.title, r.url, r.servings, r.tags, r.fetched_at, r.first_seen_at,
-                json_array_length(r.ingredients) AS ingredient_count,
+                r.ingredient_count,
                 n.kcal, n.protein, n.carbs, n.fat, n.fiber, n.coverage,
                 COALESCE(p.status, '') AS pref_status
          FROM recipes r
@@ -807,6 +1085,35 @@ export class Store {
     return row?.value ?? null;
   }
 
+  /**
+   * Meerdere sleutels in één query, zoals `matchMap` voor koppelingen. Een ronde
+   * van de automaat leest er vier voordat hij iets doet; één voor één is dat vier
+   * keer wachten op D1. Sleutels zonder waarde ontbreken in het resultaat.
+   */
+  async getStates(keys: string[]): Promise<Record<string, string>> {
+    const out: Record<string, string> = {};
+    for (const chunk of inChunks([...new Set(keys)])) {
+      const { results } = await this.db
+        .prepare(`SELECT key, value FROM app_state WHERE key IN (${holes(chunk.length)})`)
+        .bind(...chunk)
+        .all<{ key: string; value: string }>();
+      for (const row of results ?? []) out[row.key] = row.value;
+    }
+    return out;
+  }
+
+  /**
+   * Alle sleutels met een voorvoegsel, in één keer. Een bereik op de primaire
+   * sleutel in plaats van LIKE, zodat SQLite de index gebruikt.
+   */
+  async stateKeysWithPrefix(prefix: string): Promise<string[]> {
+    const { results } = await this.db
+      .prepare("SELECT key FROM app_state WHERE key >= ? AND key < ?")
+      .bind(prefix, prefix + "\uffff")
+      .all<{ key: string }>();
+    return (results ?? []).map((r) => r.key);
+  }
+
   async setState(key: string, value: string): Promise<void> {
     await this.db
       .prepare(
@@ -889,21 +1196,34 @@ export class Store {
     detail?: Record<string, unknown>,
   ): Promise<void> {
     try {
-      await this.db
-        .prepare("INSERT INTO app_logs (at, level, source, message, detail) VALUES (?, ?, ?, ?, ?)")
-        .bind(
-          Date.now(),
-          level,
-          source,
-          message.slice(0, 500),
-          detail ? JSON.stringify(detail).slice(0, 2000) : null,
-        )
-        .run();
+      await this.logStatement(level, source, message, detail).run();
     } catch {
       // Een log die niet weggeschreven kan worden mag niets breken.
     }
   }
 
+  private logStatements(entry: LogEntry | undefined, at: number): D1PreparedStatement[] {
+    return entry ? [this.logStatement(entry.level, entry.source, entry.message, entry.detail, at)] : [];
+  }
+
+  private logStatement(
+    level: LogLevel,
+    source: string,
+    message: string,
+    detail?: Record<string, unknown>,
+    at = Date.now(),
+  ): D1PreparedStatement {
+    return this.db
+      .prepare("INSERT INTO app_logs (at, level, source, message, detail) VALUES (?, ?, ?, ?, ?)")
+      .bind(
+        at,
+        level,
+        source,
+        message.slice(0, 500),
+        detail ? JSON.stringify(detail).slice(0, 2000) : null,
+      );
+  }
+
   async recentLogs(limit: number, level?: LogLevel): Promise<LogRow[]> {
     const where = level ? "WHERE level = ?" : "";
     const params: unknown[] = level ? [level, limit] : [limit];
@@ -1067,56 +1387,74 @@ export class Store {
     }));
   }
 
-  /** Vervangt de hele indeling: momenten die je weglaat verdwijnen. */
+  /**
+   * Vervangt de hele indeling: momenten die je weglaat verdwijnen. Het wissen en
+   * alle inserts gaan in één batch — D1 draait die als één transactie, dus een
+   * fout halverwege laat de oude indeling staan in plaats van een halve.
+   */
   async putSlots(slots: MealSlot[]): Promise<void> {
-    await this.db.prepare("DELETE FROM meal_slots").run();
-    for (const [index, slot] of slots.entries()) {
-      await this.db
-        .prepare(
-          `INSERT INTO meal_slots (id, name, position, kcal_share, protein_share, enabled, tags, max_kcal)
-           VALUES (?, ?, ?, ?, ?, ?, ?, ?)`,
-        )
-        .bind(
-          slot.id,
-          slot.name,
-          slot.position ?? index,
-          slot.kcalShare,
-          slot.proteinShare,
-          slot.enabled ? 1 : 0,
-          JSON.stringify(slot.tags ?? []),
-          slot.maxKcal,
-        )
-        .run();
-    }
+    const rows = slots.map((slot, index) => [
+      slot.id,
+      slot.name,
+      slot.position ?? index,
+      slot.kcalShare,
+      slot.proteinShare,
+      slot.enabled ? 1 : 0,
+      JSON.stringify(slot.tags ?? []),
+      slot.maxKcal,
+    ]);
+    await this.db.batch([
+      this.db.prepare("DELETE FROM meal_slots"),
+      ...this.insertRows(
+        "INSERT INTO meal_slots (id, name, position, kcal_share, protein_share, enabled, tags, max_kcal)",
+        rows,
+      ),
+    ]);
+  }
+
+  /**
+   * Eén INSERT met meerdere rijen achter VALUES in plaats van een statement per
+   * rij: één keer parsen en uitvoeren voor de hele reeks. D1's parameter-limiet
+   * geldt per statement, dus een lange reeks wordt over een paar statements
+   * verdeeld. Alle rijen moeten even breed zijn.
+   */
+  private insertRows(head: string, rows: unknown[][], tail = ""): D1PreparedStatement[] {
+    const width = rows[0]?.length ?? 1;
+    const row = `(${holes(width)})`;
+    return inChunks(rows, Math.max(1, Math.floor(MAX_IN_PARAMS / width))).map((chunk) =>
+      this.db
+        .prepare(`${head} VALUES ${Array.from({ length: chunk.length }, () => row).join(", ")}${tail}`)
+        .bind(...chunk.flat()),
+    );
   }
 
   // ------------------------------------------------------------ opgeslagen dagen
 
   async saveDay(day: SavedDayInput): Promise<string> {
     const id = day.id ?? `${day.date}-${Date.now().toString(36)}`;
-    await this.db
-      .prepare(
-        `INSERT INTO saved_days (id, date, name, targets, totals, created_at)
-         VALUES (?, ?, ?, ?, ?, ?)
-         ON CONFLICT(id) DO UPDATE SET
-           date = excluded.date, name = excluded.name,
-           targets = excluded.targets, totals = excluded.totals`,
-      )
-      .bind(id, day.date, day.name ?? null, JSON.stringify(day.targets), JSON.stringify(day.totals), Date.now())
-      .run();
-
-    // Opnieuw opslaan van dezelfde dag vervangt de maaltijden; anders blijven
-    // momenten staan die je net verwijderd hebt.
-    await this.db.prepare("DELETE FROM saved_day_meals WHERE day_id = ?").bind(id).run();
-    for (const meal of day.meals) {
-      await this.db
+    const insertMeal = this.db.prepare(
+      `INSERT INTO saved_day_meals (day_id, slot_id, slot_name, position, recipe_id, portions, plan)
+       VALUES (?, ?, ?, ?, ?, ?, ?)`,
+    );
+    // Dag, opruiming en maaltijden in één transactie: een dag zonder (of met
+    // half) zijn maaltijden kan zo niet achterblijven.
+    await this.db.batch([
+      this.db
         .prepare(
-          `INSERT INTO saved_day_meals (day_id, slot_id, slot_name, position, recipe_id, portions, plan)
-           VALUES (?, ?, ?, ?, ?, ?, ?)`,
+          `INSERT INTO saved_days (id, date, name, targets, totals, created_at)
+           VALUES (?, ?, ?, ?, ?, ?)
+           ON CONFLICT(id) DO UPDATE SET
+             date = excluded.date, name = excluded.name,
+             targets = excluded.targets, totals = excluded.totals`,
         )
-        .bind(id, meal.slotId, meal.slotName, meal.position, meal.recipeId, meal.portions, JSON.stringify(meal.plan))
-        .run();
-    }
+        .bind(id, day.date, day.name ?? null, JSON.stringify(day.targets), JSON.stringify(day.totals), Date.now()),
+      // Opnieuw opslaan van dezelfde dag vervangt de maaltijden; anders blijven
+      // momenten staan die je net verwijderd hebt.
+      this.db.prepare("DELETE FROM saved_day_meals WHERE day_id = ?").bind(id),
+      ...day.meals.map((meal) =>
+        insertMeal.bind(id, meal.slotId, meal.slotName, meal.position, meal.recipeId, meal.portions, JSON.stringify(meal.plan)),
+      ),
+    ]);
     return id;
   }
 
@@ -1133,28 +1471,45 @@ export class Store {
     return toSavedDay(row, results ?? []);
   }
 
-  /** Alle dagen in een periode, voor het weekoverzicht. */
+  /**
+   * Alle dagen in een periode, voor het weekoverzicht. De maaltijden van de
+   * hele periode komen in één query mee, gegroepeerd per dag, in plaats van
+   * een query per dag.
+   */
   async listDays(from: string, to: string): Promise<SavedDay[]> {
-    const { results } = await this.db
-      .prepare("SELECT * FROM saved_days WHERE date BETWEEN ? AND ? ORDER BY date ASC")
-      .bind(from, to)
-      .all<Record<string, unknown>>();
-
-    const days: SavedDay[] = [];
-    for (const row of results ?? []) {
-      const { results: meals } = await this.db
-        .prepare("SELECT * FROM saved_day_meals WHERE day_id = ? ORDER BY position ASC")
-        .bind(String(row["id"]))
-        .all<Record<string, unknown>>();
-      days.push(toSavedDay(row, meals ?? []));
+    const [{ results }, { results: meals }] = await Promise.all([
+      this.db
+        .prepare("SELECT * FROM saved_days WHERE date BETWEEN ? AND ? ORDER BY date ASC")
+        .bind(from, to)
+        .all<Record<string, unknown>>(),
+      this.db
+        .prepare(
+          `SELECT m.* FROM saved_day_meals m
+           JOIN saved_days d ON d.id = m.day_id
+           WHERE d.date BETWEEN ? AND ?
+           ORDER BY m.day_id, m.position ASC`,
+        )
+        .bind(from, to)
+        .all<Record<string, unknown>>(),
+    ]);
+
+    const byDay = new Map<string, Record<string, unknown>[]>();
+    for (const meal of meals ?? []) {
+      const dayId = String(meal["day_id"]);
+      const list = byDay.get(dayId);
+      if (list) list.push(meal);
+      else byDay.set(dayId, [meal]);
     }
-    return days;
+    return (results ?? []).map((row) => toSavedDay(row, byDay.get(String(row["id"])) ?? []));
   }
 
   async deleteDay(id: string): Promise<void> {
-    // D1 heeft foreign keys niet altijd aan staan, dus ruim de maaltijden zelf op.
-    await this.db.prepare("DELETE FROM saved_day_meals WHERE day_id = ?").bind(id).run();
-    await this.db.prepare("DELETE FROM saved_days WHERE id = ?").bind(id).run();
+    // D1 heeft foreign keys niet altijd aan staan, dus ruim de maaltijden zelf op;
+    // net als bij saveDay in één transactie, anders kan een dag half verdwijnen.
+    await this.db.batch([
+      this.db.prepare("DELETE FROM saved_day_meals WHERE day_id = ?").bind(id),
+      this.db.prepare("DELETE FROM saved_days WHERE id = ?").bind(id),
+    ]);
   }
 
   // -------------------------------------------------- voorkeuren en uitsluitingen
@@ -1195,16 +1550,23 @@ export class Store {
     return (results ?? []).map((r) => r.term);
   }
 
-  async putExclusions(terms: string[]): Promise<void> {
-    await this.db.prepare("DELETE FROM excluded_ingredients").run();
-    for (const term of terms) {
-      const clean = term.trim().toLowerCase();
-      if (!clean) continue;
-      await this.db
-        .prepare("INSERT INTO excluded_ingredients (term, created_at) VALUES (?, ?) ON CONFLICT(term) DO NOTHING")
-        .bind(clean, Date.now())
-        .run();
-    }
+  /**
+   * Vervangt de hele lijst en geeft terug wat er nu staat, in de volgorde van
+   * `getExclusions`. De tabel bevat na de batch precies deze termen, dus de
+   * aanroeper hoeft hem niet nog eens uit te lezen.
+   */
+  async putExclusions(terms: string[]): Promise<string[]> {
+    const now = Date.now();
+    const clean = [...new Set(terms.map((term) => term.trim().toLowerCase()).filter(Boolean))];
+    await this.db.batch([
+      this.db.prepare("DELETE FROM excluded_ingredients"),
+      ...this.insertRows(
+        "INSERT INTO excluded_ingredients (term, created_at)",
+        clean.map((term) => [term, now]),
+        " ON CONFLICT(term) DO NOTHING",
+      ),
+    ]);
+    return clean.sort();
   }
 }
 
@@ -1313,6 +1675,17 @@ export interface SavedDay {
   meals: SavedDayMeal[];
 }
 
+interface RecipeDbRow {
+  id: string;
+  title: string;
+  url: string;
+  servings: number;
+  image_url: string | null;
+  ingredients: string;
+  keywords: string | null;
+  nutrition_per_serving: string | null;
+}
+
 interface ShortlistRow {
   id: string;
   title: string;
@@ -1339,14 +1712,45 @@ interface ShortlistRow {
  */
 const MAX_IN_PARAMS = 90;
 
-function inChunks<T>(items: T[]): T[][] {
+/** Hoeveel ruwe payloads er tegelijk in het geheugen staan tijdens een reparse. */
+const RAW_PAGE_SIZE = 10;
+
+/** `size` kleiner dan de limiet voor een query die de lijst twee keer bindt. */
+function inChunks<T>(items: T[], size = MAX_IN_PARAMS): T[][] {
   const out: T[][] = [];
-  for (let i = 0; i < items.length; i += MAX_IN_PARAMS) {
-    out.push(items.slice(i, i + MAX_IN_PARAMS));
+  for (let i = 0; i < items.length; i += size) {
+    out.push(items.slice(i, i + size));
   }
   return out;
 }
 
+const HOLES: string[] = [];
+
+/** "?, ?, ?" voor een IN-lijst van `count` lang; per lengte één keer opgebouwd. */
+function holes(count: number): string {
+  return (HOLES[count] ??= Array.from({ length: count }, () => "?").join(", "));
+}
+
+// Alleen wat `Recipe` nodig heeft: tags, de tijdstempels en het masker leest
+// het plannen nooit, en dit wordt per kandidaat opgevraagd.
+const RECIPE_COLUMNS = "id, title, url, servings, image_url, ingredients, keywords, nutrition_per_serving";
+
+function toRecipe(row: RecipeDbRow): Recipe {
+  return {
+    id: row.id,
+    title: row.title,
+    url: row.url,
+    servings: row.servings,
+    imageUrl: row.image_url,
+    ingredients: JSON.parse(row.ingredients) as RawIngredient[],
+    keywords: parseJson<string[]>(row.keywords, []),
+    // Zonder dit zou het plannen (dat alleen uit de database leest) de gaten
+    // niet meer kunnen vullen die het scrapen wél gevuld had, en een recept
+    // ineens veel te weinig calorieen tellen.
+    nutritionPerServing: parseJson<Nutrients | null>(row.nutrition_per_serving, null),
+  };
+}
+
 function toSummary(r: ShortlistRow): RecipeSummary {
   return {
     id: r.id,
@@ -1,6 +1,5 @@
 import { Hono } from "hono";
-import { AhClient, collectRecipes, type RawScrape } from "./ah/client";
-import { extractEmbeddedJson } from "./ah/scrape";
+import { AhClient, type RawScrape } from "./ah/client";
 
 import { Store, type SavedDayMeal } from "./db/queries";
 import { resolveRecipe } from "./nutrition/resolve";
@@ -10,6 +9,7 @@ import {
   completeRecipe,
   completeRecipeIds,
   ingestComplete,
+  reparseArchive,
   scrapeClient,
 } from "./ingest/pipeline";
 import { splitTargets, type MealSlot } from "./nutrition/split";
@@ -137,11 +137,17 @@ app.get("/api/probe", async (c) => c.json(await clientFor(c.env, c.executionCtx)
 
 app.get("/api/stats", async (c) => {
   const store = storeFor(c.env);
-  const raw = await store.countRaw();
+  // Vier losse tellingen die niet op elkaar wachten: tegelijk naar D1.
+  const [raw, recipes, plannable, afgekeurd] = await Promise.all([
+    store.countRaw(),
+    store.countRecipes(),
+    store.countPlannable(),
+    store.countSkippedRecipes(),
+  ]);
   return c.json({
-    recipes: await store.countRecipes(),
-    plannable: await store.countPlannable(),
-    afgekeurd: await store.countSkippedRecipes(),
+    recipes,
+    plannable,
+    afgekeurd,
     scrapes: raw.total,
     unparsed: raw.unparsed,
   });
@@ -205,35 +211,8 @@ app.post("/api/ingest", async (c) => {
  */
 app.post("/api/reparse", async (c) => {
   const body = await c.req.json<{ limit?: number }>().catch(() => ({}) as { limit?: number });
-  const store = storeFor(c.env);
-  const client = clientFor(c.env, c.executionCtx);
-  const rows = await store.latestRawPerRef("recipe", body.limit ?? 200);
-
-  let recovered = 0;
-  const failed: string[] = [];
-  for (const row of rows) {
-    try {
-      const found = collectRecipes(extractEmbeddedJson(row.body));
-      const recipe = found.find((r) => r.ingredients.length > 0);
-      if (!recipe) {
-        await store.markRawParsed(row.id, false, "geen recept met ingredienten gevonden");
-        failed.push(row.ref);
-        continue;
-      }
-      // Dit is een reparatie uit het archief, geen scrape: alles wat nodig is
-      // staat in de bewaarde pagina, dus er gaat geen enkel verzoek naar ah.nl.
-      const outcome = await completeRecipe(store, recipe);
-      await store.markRawParsed(row.id, outcome === "opgeslagen", null);
-      if (outcome === "opgeslagen") recovered++;
-      else failed.push(row.ref);
-    } catch (err) {
-      const message = err instanceof Error ? err.message : String(err);
-      await store.markRawParsed(row.id, false, message);
-      failed.push(row.ref);
-    }
-  }
-
-  return c.json({ examined: rows.length, recovered, failed: failed.slice(0, 20) });
+  const { examined, recovered, failed } = await reparseArchive(storeFor(c.env), body.limit ?? 200);
+  return c.json({ examined, recovered, failed: failed.slice(0, 20) });
 });
 
 /**
@@ -365,8 +344,9 @@ app.post("/api/generate", async (c) => {
 
   const targets = buildTargets(body);
   const plans: Plan[] = [];
+  const recipes = await store.getRecipes(shortlist.map((summary) => summary.id));
   for (const summary of shortlist) {
-    const recipe = await store.getRecipe(summary.id);
+    const recipe = recipes.get(summary.id);
     if (!recipe) continue;
     const matches = await store.productMatchesFor(recipe.ingredients.map((i) => i.name.toLowerCase()));
     const resolved = resolveRecipe(recipe, matches);
@@ -404,8 +384,7 @@ app.post("/api/match", async (c) => {
   const store = storeFor(c.env);
   const product = await clientFor(c.env, c.executionCtx).getProduct(body.webshopId);
   if (!product) return c.json({ error: "product not found" }, 404);
-  await store.putProduct(product);
-  await store.overrideMatch(body.ingredient.toLowerCase(), product.webshopId);
+  await store.overrideMatch(body.ingredient.toLowerCase(), product);
   return c.json({ ok: true, product });
 });
 
@@ -739,8 +718,7 @@ app.get("/api/exclusions", async (c) => c.json({ terms: await storeFor(c.env).ge
 app.put("/api/exclusions", async (c) => {
   const body = await c.req.json<{ terms?: unknown[] }>().catch(() => ({ terms: [] }));
   const terms = (body.terms ?? []).map((t) => String(t));
-  await storeFor(c.env).putExclusions(terms);
-  return c.json({ terms: await storeFor(c.env).getExclusions() });
+  return c.json({ terms: await storeFor(c.env).putExclusions(terms) });
 });
 
 // ------------------------------------------------------------------- types
@@ -149,16 +149,19 @@ export async function runAutoIngest(
 ): Promise<AutoResult> {
   const store = new Store(env.DB);
   const now = config.now?.() ?? Date.now();
+  // Wat de ronde vooraf moet weten in één query; niets hiervan verandert
+  // voordat het gebruikt wordt.
+  const state = await store.getStates([PAUSED, COOLDOWN_UNTIL, CURSOR, CLEANUP_DONE]);
 
   if (!options.force) {
     // Uitgezet betekent uit. Zonder deze schakelaar is de database niet leeg te
     // houden: de cron draait elke twee minuten, dus alles wat je wist staat er
     // een paar tellen later weer in.
-    if ((await store.getState(PAUSED)) === "1") {
+    if (state[PAUSED] === "1") {
       return { ran: false, reason: "automatisch bijvullen staat uit" };
     }
 
-    const until = Number((await store.getState(COOLDOWN_UNTIL)) ?? 0);
+    const until = Number(state[COOLDOWN_UNTIL] ?? 0);
     if (until > now) {
       await store.log("info", "auto", "ronde overgeslagen: afkoelen na blokkade", {
         tot: new Date(until).toISOString(),
@@ -173,21 +176,24 @@ export async function runAutoIngest(
     }
   }
 
-  // De log begrensd houden, anders groeit hij oneindig door in een database
-  // waar verder alles een bovengrens heeft.
-  await store.trimLogs(config.logKeep);
-  // Eenmalig: alles wat nog uit de tijd van halffabricaten stamt eruit. Zie
-  // `dropIncompleteRecipes`.
-  await cleanupOnce(store);
-
   // Rouleren over de eetmomenten, en binnen een moment over de zoektermen, zodat
   // de database over de dag gelijkmatig alle hoeken raakt in plaats van vijftig
   // pastarecepten achter elkaar.
-  const cursor = Number((await store.getState(CURSOR)) ?? 0) || 0;
+  const cursor = Number(state[CURSOR] ?? 0) || 0;
   const moment = MOMENTS[cursor % MOMENTS.length]!;
   const queries = MOMENT_QUERIES[moment]!;
   const query = queries[Math.floor(cursor / MOMENTS.length) % queries.length]!;
-  await store.setState(CURSOR, String((cursor + 1) % (MOMENTS.length * queries.length)));
+
+  // Drie dingen vooraf die niets met elkaar te maken hebben, dus tegelijk: één
+  // wachttijd naar D1 in plaats van drie voordat het eerste verzoek de deur uit
+  // gaat. De log begrensd houden, anders groeit hij oneindig door in een
+  // database waar verder alles een bovengrens heeft; eenmalig alles uit de tijd
+  // van halffabricaten eruit (zie `dropIncompleteRecipes`); en de cursor door.
+  await Promise.all([
+    store.trimLogs(config.logKeep),
+    cleanupOnce(store, env.DB, state[CLEANUP_DONE] === "1"),
+    store.setState(CURSOR, String((cursor + 1) % (MOMENTS.length * queries.length))),
+  ]);
 
   await store.log("info", "auto", `ronde: ${query}`);
   const runId = await store.startRun("scrape", `${moment}: ${query}`);
@@ -217,16 +223,28 @@ export async function runAutoIngest(
 /** app_state-sleutel voor de eenmalige opruiming; zie `cleanupOnce`. */
 const CLEANUP_DONE = "cleanup:complete_only";
 
+/** Databases waarvan dit isolate al weet dat de opruiming gedaan is. */
+const cleanedUp = new WeakSet<D1Database>();
+
 /**
  * Ruimt één keer op wat uit de vorige opzet is blijven staan: recepten zonder
  * ingredienten of zonder doorgerekende voedingswaarde. Vanaf nu kan zoiets niet
  * meer ontstaan — een recept gaat compleet de database in of helemaal niet — dus
  * dit hoeft precies één keer te gebeuren en daarna nooit meer.
  */
-async function cleanupOnce(store: Store): Promise<void> {
-  if ((await store.getState(CLEANUP_DONE)) === "1") return;
+async function cleanupOnce(store: Store, db: D1Database, done: boolean): Promise<void> {
+  // Staat het eenmaal vast, dan hoeft dit isolate het niet elke cronronde
+  // opnieuw aan D1 te vragen. Per database-binding, zodat een verse database
+  // (zoals in de tests) gewoon zelf gecontroleerd wordt. `done` is de vlag uit
+  // app_state, al opgehaald met de rest van de stand van de ronde.
+  if (cleanedUp.has(db)) return;
+  if (done) {
+    cleanedUp.add(db);
+    return;
+  }
   const removed = await store.dropIncompleteRecipes();
   await store.setState(CLEANUP_DONE, "1");
+  cleanedUp.add(db);
   if (removed > 0) {
     await store.log("info", "auto", `${removed} onvolledige recepten uit de oude opzet verwijderd`);
   }
@@ -284,21 +302,31 @@ export async function setAutoPaused(env: ScrapeEnv, paused: boolean): Promise<vo
   await store.log("info", "auto", `automatisch bijvullen ${paused ? "uitgezet" : "aangezet"}`);
 }
 
-/** Stand van zaken voor de UI: loopt het nog, en hoe hard. */
+/**
+ * Stand van zaken voor de UI: loopt het nog, en hoe hard. De opvragingen hangen
+ * niet van elkaar af, dus ze gaan tegelijk naar D1 in plaats van na elkaar — het
+ * statuspaneel wacht dan op de traagste in plaats van op de som.
+ */
 export async function autoStatus(env: ScrapeEnv, config: AutoConfig = DEFAULT_AUTO_CONFIG) {
   const store = new Store(env.DB);
-  const cooldownUntil = Number((await store.getState(COOLDOWN_UNTIL)) ?? 0);
-  const today = await store.runTotalsSince(startOfToday());
+  const [state, today, recepten, afgekeurd, rondes] = await Promise.all([
+    store.getStates([COOLDOWN_UNTIL, PAUSED, BLOCK_STREAK, CURSOR]),
+    store.runTotalsSince(startOfToday()),
+    store.countRecipes(),
+    store.countSkippedRecipes(),
+    store.recentRuns(10),
+  ]);
+  const until = Number(state[COOLDOWN_UNTIL] ?? 0);
 
   return {
     vandaag: today,
     dagbudget: config.dailyMax,
-    recepten: await store.countRecipes(),
-    afgekeurd: await store.countSkippedRecipes(),
-    gepauzeerd: (await store.getState(PAUSED)) === "1",
-    afkoelenTot: cooldownUntil > Date.now() ? cooldownUntil : null,
-    blokkadesOpEenRij: Number((await store.getState(BLOCK_STREAK)) ?? 0),
-    volgende: MOMENTS[Number((await store.getState(CURSOR)) ?? 0) % MOMENTS.length],
-    rondes: await store.recentRuns(10),
+    recepten,
+    afgekeurd,
+    gepauzeerd: state[PAUSED] === "1",
+    afkoelenTot: until > Date.now() ? until : null,
+    blokkadesOpEenRij: Number(state[BLOCK_STREAK] ?? 0),
+    volgende: MOMENTS[Number(state[CURSOR] ?? 0) % MOMENTS.length],
+    rondes,
   };
 }
@@ -1,5 +1,5 @@
 import { GqlClient, type ProductSuggestion } from "../ah/gql";
-import type { Recipe } from "../ah/types";
+import type { Product, Recipe } from "../ah/types";
 import { isBudgetError } from "../ah/client";
 import type { ScrapeEnv } from "./pipeline";
 import { Store } from "../db/queries";
@@ -58,9 +58,11 @@ export function matchSuggestionsToIngredients(
 ): (ProductSuggestion | null)[] {
   const out: (ProductSuggestion | null)[] = new Array(ingredients.length).fill(null);
 
+  // Elke naam één keer genormaliseerd: de sleutels dienen zowel voor de
+  // opzoektabel als voor de woordcontrole op volgorde hieronder.
+  const keys = suggestions.map((s) => tokenize(s.ingredientName).join(" "));
   const byKey = new Map<string, number[]>();
-  suggestions.forEach((s, i) => {
-    const key = tokenize(s.ingredientName).join(" ");
+  keys.forEach((key, i) => {
     if (!key) return;
     const bucket = byKey.get(key);
     if (bucket) bucket.push(i);
@@ -78,10 +80,9 @@ export function matchSuggestionsToIngredients(
       return;
     }
     if (index < suggestions.length && !used.has(index)) {
-      const candidate = suggestions[index]!;
-      if (sharesToken(key, tokenize(candidate.ingredientName).join(" "))) {
+      if (sharesToken(key, keys[index]!)) {
         used.add(index);
-        out[index] = candidate;
+        out[index] = suggestions[index]!;
       }
     }
   });
@@ -130,7 +131,8 @@ export async function enrichRecipeWithProducts(
   }
 
   const perIngredient = matchSuggestionsToIngredients(recipe.ingredients, suggestions);
-  const seen = new Set<string>();
+  const links: { ingredientName: string; webshopId: string; score: number }[] = [];
+  const unique = new Map<string, ProductSuggestion>();
 
   for (const [index, ingredient] of recipe.ingredients.entries()) {
     // Vrije ingrediënten (water, zout, peper) krijgen nooit een koppeling:
@@ -141,40 +143,52 @@ export async function enrichRecipeWithProducts(
     if (!suggestion?.productId) continue;
 
     result.matched++;
-    // De koppeling op naam is lokaal en kost niets; de boodschappenlijst hangt
-    // hieraan. AH's eigen suggestie is per definitie de juiste: score 1.
-    await store.putMatch(ingredient.name, suggestion.productId, 1);
+    // AH's eigen suggestie is per definitie de juiste: score 1.
+    links.push({ ingredientName: ingredient.name, webshopId: suggestion.productId, score: 1 });
+    if (!unique.has(suggestion.productId)) unique.set(suggestion.productId, suggestion);
+  }
 
-    if (seen.has(suggestion.productId)) continue;
-    seen.add(suggestion.productId);
+  // De koppelingen op naam zijn lokaal en kosten niets; de boodschappenlijst
+  // hangt hieraan. Ze gaan in één batch de database in, vóór de productverzoeken,
+  // zodat een budget dat onderweg opraakt ze niet meer kan kosten. Welke
+  // producten er al staan komt in één query, in plaats van één per product; de
+  // twee hangen niet van elkaar af en wachten dus tegelijk op D1.
+  const [, known] = await Promise.all([store.putMatches(links), store.productMap([...unique.keys()])]);
+  const fetched: Product[] = [];
+
+  // Wat al opgehaald is gaat hoe dan ook de database in, ook als er onderweg
+  // iets gooit: anders kost een afgebroken recept de volgende keer dezelfde
+  // verzoeken aan ah.nl opnieuw.
+  try {
+    for (const [productId, suggestion] of unique) {
+      if (productId in known) {
+        result.cached++;
+        continue;
+      }
 
-    if (await store.getProduct(suggestion.productId)) {
-      result.cached++;
-      continue;
-    }
+      let nutrition: Awaited<ReturnType<GqlClient["productNutrition"]>>;
+      try {
+        nutrition = await client.productNutrition(productId);
+      } catch (err) {
+        // Budget op: de koppelingen op naam zijn al opgeslagen en kostten niets;
+        // alleen het product zelf blijft liggen.
+        if (isBudgetError(err)) continue;
+        fail("product " + productId + ": " + (err instanceof Error ? err.message : String(err)));
+        continue;
+      }
 
-    let nutrition: Awaited<ReturnType<GqlClient["productNutrition"]>>;
-    try {
-      nutrition = await client.productNutrition(suggestion.productId);
-    } catch (err) {
-      // Budget op: de koppelingen op naam zijn al opgeslagen en kostten niets;
-      // alleen het product zelf blijft liggen. De resterende regels krijgen hun
-      // lokale koppeling nog wel.
-      if (isBudgetError(err)) continue;
-      fail("product " + suggestion.productId + ": " + (err instanceof Error ? err.message : String(err)));
-      continue;
+      // Ook zonder voedingswaarde bewaren we het product: dan weten we dat we het
+      // al opgehaald hebben en kost het volgende recept er geen verzoek aan.
+      fetched.push({
+        webshopId: productId,
+        title: suggestion.productTitle ?? productId,
+        salesUnitSize: suggestion.salesUnitSize,
+        per100g: nutrition?.per100g ?? {},
+      });
+      result.products++;
     }
-
-    // Ook zonder voedingswaarde bewaren we het product: dan weten we dat we het
-    // al opgehaald hebben en kost het volgende recept er geen verzoek aan.
-    await store.putProduct({
-      webshopId: suggestion.productId,
-      title: suggestion.productTitle ?? suggestion.productId,
-      salesUnitSize: suggestion.salesUnitSize,
-      per100g: nutrition?.per100g ?? {},
-    });
-    result.products++;
+  } finally {
+    await store.putProducts(fetched);
   }
-
   return result;
 }
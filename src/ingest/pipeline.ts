@@ -1,6 +1,7 @@
-import { AhClient, isBudgetError } from "../ah/client";
+import { AhClient, collectRecipes, isBudgetError } from "../ah/client";
+import { extractEmbeddedJson } from "../ah/scrape";
 import type { Recipe } from "../ah/types";
-import { Store } from "../db/queries";
+import { Store, type RecipeWrite } from "../db/queries";
 import { recipeTotal } from "../nutrition/resolve";
 import { enrichRecipeWithProducts } from "./enrich";
 
@@ -80,11 +81,6 @@ export function scrapeClient(env: ScrapeEnv, store: Store, options?: ClientOptio
   return new AhClient(
     env.AH_USER_AGENT,
     (raw) => {
-      // Alleen receptpagina's het archief in. Productpagina's zijn 500-700 kB per
-      // stuk en we bewaren er toch alleen de voedingswaarde uit; recept-HTML is
-      // waarmee parserfouten te vinden en te repareren zijn.
-      if (raw.kind === "recipe" || raw.kind === "recipe_search") void store.putRaw(raw);
-
       // Eén keer vaststellen dat dit endpoint dood is, en dat onthouden over
       // rondes heen: anders kost het elke twee minuten opnieuw een verzoek uit
       // een budget van veertig, én is het een tweede verzoek binnen een seconde
@@ -92,12 +88,18 @@ export function scrapeClient(env: ScrapeEnv, store: Store, options?: ClientOptio
       if (raw.url.includes("/service/search/recipes") && !isUsableJson(raw)) {
         void store.setState(RECIPE_JSON_DEAD, "1");
       }
-      // Elk verzoek aan ah.nl ook als logregel: de statuscode per verzoek is
-      // precies wat je wilt zien als er niets binnenkomt.
-      void store.log(raw.status >= 400 ? "warn" : "info", "ah", `${raw.kind} ${raw.ref} -> ${raw.status}`, {
-        url: raw.url,
-        bytes: raw.body.length,
-      });
+      // Elk verzoek aan ah.nl als logregel: de statuscode per verzoek is precies
+      // wat je wilt zien als er niets binnenkomt. Alleen receptpagina's gaan
+      // daarbij het archief in. Productpagina's zijn 500-700 kB per stuk en we
+      // bewaren er toch alleen de voedingswaarde uit; recept-HTML is waarmee
+      // parserfouten te vinden en te repareren zijn.
+      void store.recordFetch(
+        raw,
+        raw.kind === "recipe" || raw.kind === "recipe_search",
+        raw.status >= 400 ? "warn" : "info",
+        `${raw.kind} ${raw.ref} -> ${raw.status}`,
+        { url: raw.url, bytes: raw.body.length },
+      );
     },
     options,
   );
@@ -139,33 +141,136 @@ export type CompleteOutcome = "opgeslagen" | "afgekeurd" | "overgeslagen";
  * kost is de receptpagina zelf.
  */
 export async function completeRecipe(store: Store, recipe: Recipe): Promise<CompleteOutcome> {
-  if (recipe.ingredients.length === 0) {
-    await store.skipRecipe(recipe.id, "geen ingredientenlijst op de pagina");
+  const write = recipeWrite(recipe);
+  // De logregel gaat in dezelfde batch mee: per recept één schrijfronde naar D1
+  // in plaats van twee.
+  if ("skip" in write) {
+    await store.skipRecipe(write.skip, write.reason, write.entry);
     return "afgekeurd";
   }
+  await store.putCompleteRecipe(write.recipe, write.total, write.entry);
+  return "opgeslagen";
+}
+
+/** Het oordeel van completeRecipe, zonder het al weg te schrijven. */
+function recipeWrite(recipe: Recipe): RecipeWrite {
+  if (recipe.ingredients.length === 0) {
+    return { skip: recipe.id, reason: "geen ingredientenlijst op de pagina" };
+  }
 
   const total = recipeTotal(recipe);
   if (!total) {
-    await store.skipRecipe(recipe.id, "geen voedingswaarde op de receptpagina");
-    await store.log("info", "ingest", `${recipe.title} afgekeurd`, {
-      recept: recipe.id,
-      reden: "AH geeft geen voedingswaarde bij dit recept",
-    });
-    return "afgekeurd";
+    return {
+      skip: recipe.id,
+      reason: "geen voedingswaarde op de receptpagina",
+      entry: {
+        level: "info",
+        source: "ingest",
+        message: `${recipe.title} afgekeurd`,
+        detail: { recept: recipe.id, reden: "AH geeft geen voedingswaarde bij dit recept" },
+      },
+    };
   }
 
-  await store.putRecipe(recipe);
   // Dekking 1: de voedingswaarde is compleet en van AH zelf. Er valt niets meer
   // te wegen aan hoeveel we ervan vonden — dat was de vraag toen het uit losse
   // producten opgeteld werd.
-  await store.putNutrition(recipe.id, total, 1, "ah");
-  await store.log("info", "ingest", `${recipe.title} opgeslagen`, {
-    recept: recipe.id,
-    ingredienten: recipe.ingredients.length,
-    porties: recipe.servings,
-    kcal: Math.round(total.kcal ?? 0),
-  });
-  return "opgeslagen";
+  return {
+    recipe,
+    total,
+    entry: {
+      level: "info",
+      source: "ingest",
+      message: `${recipe.title} opgeslagen`,
+      detail: {
+        recept: recipe.id,
+        ingredienten: recipe.ingredients.length,
+        porties: recipe.servings,
+        kcal: Math.round(total.kcal ?? 0),
+      },
+    },
+  };
+}
+
+/** Wat een reparse-ronde opleverde. */
+export interface ReparseResult {
+  examined: number;
+  recovered: number;
+  failed: string[];
+}
+
+/**
+ * Hoeveel herstelde recepten er samen in één batch naar D1 gaan. Per recept
+ * zijn dat twee of drie statements.
+ */
+const REPARSE_BATCH = 25;
+
+/** Hoeveel opgehaalde recepten ingestComplete samen in één batch wegschrijft. */
+const INGEST_BATCH = 10;
+
+/**
+ * Bouwt recepten opnieuw op uit het ruwe archief, met de parser van nu. Elk
+ * recept krijgt hetzelfde oordeel als in completeRecipe, maar het wegschrijven
+ * gaat per REPARSE_BATCH recepten in één batch in plaats van één per recept.
+ * Die batch loopt achter op het parsen: terwijl D1 schrijft, wordt de volgende
+ * pagina al ontleed. Lukt een batch niet, dan telt elk recept erin als mislukt.
+ */
+export async function reparseArchive(store: Store, limit: number): Promise<ReparseResult> {
+  let examined = 0;
+  let recovered = 0;
+  const failed: string[] = [];
+  // De markeringen gaan aan het eind in één batch mee, niet één UPDATE per rij;
+  // valt de ronde halverwege om, dan worden die rijen gewoon opnieuw geprobeerd.
+  const marks: { id: string; ok: boolean; error: string | null }[] = [];
+  const settle = (id: string, ref: string, ok: boolean, error: string | null) => {
+    marks.push({ id, ok, error });
+    if (ok) recovered++;
+    else failed.push(ref);
+  };
+
+  let rows: { id: string; ref: string }[] = [];
+  let writes: RecipeWrite[] = [];
+  let pending: Promise<void> | null = null;
+  const flush = () => {
+    const batchRows = rows;
+    const batchWrites = writes;
+    rows = [];
+    writes = [];
+    return store.putRecipeWrites(batchWrites).then(
+      () => batchRows.forEach((row, i) => settle(row.id, row.ref, !("skip" in batchWrites[i]!), null)),
+      (err) => {
+        const message = err instanceof Error ? err.message : String(err);
+        for (const row of batchRows) settle(row.id, row.ref, false, message);
+      },
+    );
+  };
+
+  for await (const row of store.eachLatestRaw("recipe", limit)) {
+    examined++;
+    try {
+      const recipe = collectRecipes(extractEmbeddedJson(row.body)).find((r) => r.ingredients.length > 0);
+      if (!recipe) {
+        settle(row.id, row.ref, false, "geen recept met ingredienten gevonden");
+        continue;
+      }
+      // Dit is een reparatie uit het archief, geen scrape: alles wat nodig is
+      // staat in de bewaarde pagina, dus er gaat geen enkel verzoek naar ah.nl.
+      rows.push(row);
+      writes.push(recipeWrite(recipe));
+    } catch (err) {
+      settle(row.id, row.ref, false, err instanceof Error ? err.message : String(err));
+      continue;
+    }
+    if (writes.length >= REPARSE_BATCH) {
+      await pending;
+      pending = flush();
+    }
+  }
+  await pending;
+  if (writes.length > 0) await flush();
+
+  await store.markRawParsedMany(marks);
+  return { examined, recovered, failed };
 }
 
 /**
@@ -182,26 +287,46 @@ export async function completeRecipeIds(
   const client = scrapeClient(env, store, clientOptions);
 
   let enriched = 0;
+  // Zoals in ingestComplete loopt opslaan één recept achter op het ophalen:
+  // D1 schrijft het vorige recept weg terwijl de volgende pagina onderweg is.
+  // Het tempo richting ah.nl verandert daar niet door.
+  let pending: Promise<unknown> | null = null;
+  // Dit draait buiten het antwoord om, dus niemand ziet een fout tenzij hij in
+  // de log staat. Eén plek voor het ophalen en het opslaan, zoals in ingestComplete.
+  const fail = async (id: string, err: unknown) => {
+    const message = err instanceof Error ? err.message : String(err);
+    await store.log("error", "ingest", `recept ${id} mislukt`, { fout: message });
+  };
+  const known = await store.knownRecipeIds(ids);
   for (const id of ids) {
     if (client.budget.max - client.budget.used < 1) break;
+    if (known.has(id)) continue;
+    known.add(id);
     try {
-      if (await store.isKnownRecipe(id)) continue;
       const recipe = await client.getRecipe(id);
-      if (recipe) {
-        const outcome = await completeRecipe(store, recipe);
-        if (outcome === "opgeslagen" && enrich && enriched < enrich.perRun) {
-          enriched++;
-          await enrichRecipeWithProducts(env, store, recipe, {
-            minIntervalMs: clientOptions?.minIntervalMs,
-            backoffMs: clientOptions?.backoffMs,
-            maxRequests: client.budget.max - client.budget.used,
-          });
-        }
+      await pending;
+      pending = null;
+      if (!recipe) continue;
+      // Verrijken moet weten of het recept erin kwam; dan meteen opslaan.
+      if (!enrich || enriched >= enrich.perRun) {
+        pending = completeRecipe(store, recipe).catch((err) => fail(recipe.id, err));
+        continue;
+      }
+      if ((await completeRecipe(store, recipe)) === "opgeslagen") {
+        enriched++;
+        await enrichRecipeWithProducts(env, store, recipe, {
+          minIntervalMs: clientOptions?.minIntervalMs,
+          backoffMs: clientOptions?.backoffMs,
+          maxRequests: client.budget.max - client.budget.used,
+        });
       }
-    } catch {
-      // volgende recept; dit draait buiten het antwoord om
+    } catch (err) {
+      // Budget op: niets vastleggen, een volgende zoekopdracht probeert het opnieuw.
+      if (isBudgetError(err)) break;
+      await fail(id, err);
     }
   }
+  await pending;
 }
 
 /**
@@ -238,8 +363,79 @@ export async function ingestComplete(
   // Eén verzoek over is genoeg voor nog een recept: de pagina zelf.
   const budgetLeft = () => client.budget.max - client.budget.used;
 
+  // Opslaan loopt achter op het ophalen: terwijl de volgende pagina onderweg is,
+  // schrijft D1 de vorige weg. Het tempo richting ah.nl blijft precies hetzelfde,
+  // maar de schrijfronden tellen niet meer bovenop de wachttijd. Recepten gaan
+  // per INGEST_BATCH samen in één batch, zodat een ronde van dertig recepten
+  // drie schrijfacties kost in plaats van dertig en wat binnen is toch snel in
+  // de lijst staat. Er staat nooit meer dan één batch open.
+  let queued: RecipeWrite[] = [];
+  let flying = 0;
+  let pending: Promise<void> | null = null;
+  const write = async (writes: RecipeWrite[]) => {
+    try {
+      await store.putRecipeWrites(writes);
+      for (const w of writes) {
+        if ("skip" in w) rejected++;
+        else added++;
+      }
+    } catch (err) {
+      const message = err instanceof Error ? err.message : String(err);
+      for (const w of writes) {
+        const id = "skip" in w ? w.skip : w.recipe.id;
+        errors.push(`${id}: ${message}`);
+        await store.log("error", "ingest", `recept ${id} mislukt`, { fout: message });
+      }
+    } finally {
+      flying = 0;
+    }
+  };
+  const flush = async () => {
+    await pending;
+    const writes = queued;
+    queued = [];
+    flying = writes.length;
+    pending = writes.length > 0 ? write(writes) : null;
+  };
+  // Ook een afkeuring zonder recept gaat in de wachtrij: dat is net zo goed
+  // een schrijfactie per recept, en die past in dezelfde batch.
+  const enqueue = async (w: RecipeWrite) => {
+    queued.push(w);
+    if (queued.length >= INGEST_BATCH) await flush();
+  };
+  const settle = async () => {
+    await flush();
+    await pending;
+    pending = null;
+  };
+  const save = async (recipe: Recipe): Promise<CompleteOutcome | null> => {
+    try {
+      const outcome = await completeRecipe(store, recipe);
+      if (outcome === "opgeslagen") added++;
+      else if (outcome === "afgekeurd") rejected++;
+      return outcome;
+    } catch (err) {
+      const message = err instanceof Error ? err.message : String(err);
+      errors.push(`${recipe.id}: ${message}`);
+      await store.log("error", "ingest", `recept ${recipe.id} mislukt`, { fout: message });
+      return null;
+    }
+  };
+  // Wat nog wacht of onderweg is kan de limiet halen; pas na afloop weten we of
+  // er nog een recept bij past, en dat mag geen verzoek kosten.
+  const full = async () => {
+    if (added + flying + queued.length < limit) return false;
+    await settle();
+    return added >= limit;
+  };
+
+  // Wat deze ronde al langskwam, over alle zoekpagina's heen. Populaire
+  // recepten staan op de pagina van meerdere zoektermen; die hoeven D1 dan niet
+  // opnieuw gevraagd te worden.
+  const seen = new Set<string>();
+
   for (const query of queries) {
-    if (budgetLeft() < 2 || added >= limit) break;
+    if (budgetLeft() < 2 || (await full())) break;
 
     let found: Recipe[];
     try {
@@ -253,32 +449,43 @@ export async function ingestComplete(
       continue;
     }
 
+    // Al bekend of al afgekeurd: kost geen enkel verzoek om over te slaan. De
+    // hele zoekpagina in één query, en alleen voor wat deze ronde nog niet zag;
+    // wat hier langskomt telt daarna ook als gezien, zodat een recept dat twee
+    // keer voorbijkomt één keer kost.
+    const unseen = found.map((stub) => stub.id).filter((id) => !seen.has(id));
+    const known = unseen.length > 0 ? await store.knownRecipeIds(unseen) : new Set<string>();
     for (const stub of found) {
-      if (budgetLeft() < 1 || added >= limit) break;
-      // Al bekend of al afgekeurd: kost geen enkel verzoek om over te slaan.
-      if (await store.isKnownRecipe(stub.id)) continue;
+      if (budgetLeft() < 1 || (await full())) break;
+      if (seen.has(stub.id) || known.has(stub.id)) {
+        seen.add(stub.id);
+        continue;
+      }
+      seen.add(stub.id);
 
       try {
         const recipe = stub.ingredients.length > 0 ? stub : await client.getRecipe(stub.id);
         if (!recipe) {
-          await store.skipRecipe(stub.id, "receptpagina gaf geen recept");
-          rejected++;
+          await enqueue({ skip: stub.id, reason: "receptpagina gaf geen recept" });
           continue;
         }
 
-        const outcome = await completeRecipe(store, recipe);
-        if (outcome === "opgeslagen") {
-          added++;
-          if (enrich && enriched < enrich.perRun && budgetLeft() > 2) {
-            enriched++;
-            const enrichedResult = await enrichRecipeWithProducts(env, store, recipe, {
-              minIntervalMs: clientOptions?.minIntervalMs,
-              backoffMs: clientOptions?.backoffMs,
-              maxRequests: budgetLeft(),
-            });
-            for (const message of enrichedResult.errors.slice(0, 3)) errors.push(message);
-          }
-        } else if (outcome === "afgekeurd") rejected++;
+        // Verrijken doet zelf verzoeken en moet weten of het recept erin kwam;
+        // dan wordt er gewoon meteen opgeslagen.
+        if (!enrich || enriched >= enrich.perRun) {
+          await enqueue(recipeWrite(recipe));
+          continue;
+        }
+        await settle();
+        if ((await save(recipe)) === "opgeslagen" && budgetLeft() > 2) {
+          enriched++;
+          const enrichedResult = await enrichRecipeWithProducts(env, store, recipe, {
+            minIntervalMs: clientOptions?.minIntervalMs,
+            backoffMs: clientOptions?.backoffMs,
+            maxRequests: budgetLeft(),
+          });
+          for (const message of enrichedResult.errors.slice(0, 3)) errors.push(message);
+        }
       } catch (err) {
         // Budget op: niets vastleggen. Volgende ronde begint dit recept opnieuw.
         if (isBudgetError(err)) break;
@@ -289,6 +496,7 @@ export async function ingestComplete(
       }
     }
   }
+  await settle();
 
   await store.log(
     blocked > 0 ? "warn" : "info",
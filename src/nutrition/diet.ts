@@ -131,14 +131,61 @@ export function deriveTags(recipe: Recipe): string[] {
   return [...tags];
 }
 
-/** Het eetmoment dat AH zelf aan een recept hangt, of null als het niets zegt. */
+/**
+ * Het eetmoment dat AH zelf aan een recept hangt, of null als het niets zegt.
+ *
+ * Dezelfde uitkomst als het eerste momentlabel uit `deriveTags`, maar zonder de
+ * inhoudsregels: die leveren nooit een moment op, en de planner vraagt dit voor
+ * elke kandidaat. AH's keywords beslissen eerst; pas als die zwijgen komen de
+ * titel en de ingredienten aan de beurt, in de volgorde van MOMENT_RULES.
+ */
 export function momentOf(recipe: Recipe): string | null {
-  for (const tag of deriveTags(recipe)) {
-    if (tag === "ontbijt" || tag === "lunch" || tag === "snack" || tag === "diner") return tag;
+  for (const keyword of recipe.keywords ?? []) {
+    const moment = AH_MOMENTS[keyword];
+    if (moment) return moment;
   }
+  const text = searchableText(recipe);
+  for (const [tag, re] of MOMENT_RULES) if (re.test(text)) return tag;
   return null;
 }
 
+/**
+ * Een vast bit per inhoudslabel, voor `recipes.diet_mask`. Deze waarden staan in
+ * de database (zie migrations/0008_recipe_diet_mask.sql), dus nooit
+ * hernummeren; een nieuw label krijgt het volgende vrije bit.
+ */
+export const DIET_BITS: Record<string, number> = {
+  varken: 1,
+  vlees: 2,
+  vis: 4,
+  zuivel: 8,
+  ei: 16,
+  noten: 32,
+  gluten: 64,
+};
+
+/** De labels van een recept als masker; labels zonder bit tellen niet mee. */
+export function dietMask(tags: string[]): number {
+  let mask = 0;
+  for (const tag of tags) mask |= DIET_BITS[tag] ?? 0;
+  return mask;
+}
+
+/**
+ * Wat deze dieetkeuzes verbieden, als masker plus de labels die (nog) geen bit
+ * hebben en dus los gecontroleerd moeten worden.
+ */
+export function forbiddenMask(diet: string[]): { mask: number; rest: string[] } {
+  let mask = 0;
+  const rest: string[] = [];
+  for (const tag of forbiddenTags(diet)) {
+    const bit = DIET_BITS[tag];
+    if (bit === undefined) rest.push(tag);
+    else mask |= bit;
+  }
+  return { mask, rest };
+}
+
 /** De inhoudslabels die deze dieetkeuzes samen verbieden. */
 export function forbiddenTags(diet: string[]): string[] {
   const out = new Set<string>();
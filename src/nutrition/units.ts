@@ -150,32 +150,34 @@ export function isKnownUnit(word: string): boolean {
   return unit in MASS_G || unit in VOLUME_ML || unit === "x" || PIECE_UNITS.has(unit);
 }
 
+/**
+ * A lookup table with its longest words first, built once: the first word found
+ * in a name is then the longest match, and the scan can stop there. The sort is
+ * stable, so words of equal length keep their table order, as before.
+ */
+function longestFirst(table: Record<string, number>): [string, number][] {
+  return Object.entries(table).sort(([a], [b]) => b.length - a.length);
+}
+
+const DENSITY_WORDS = longestFirst(DENSITY_G_PER_ML);
+const PIECE_WORDS = longestFirst(PIECE_WEIGHTS);
+
 /** Picks the best density match by looking for any known word inside the name. */
 export function densityFor(name: string): number {
   const n = name.toLowerCase();
-  let best = 1.0;
-  let bestLen = 0;
-  for (const [word, density] of Object.entries(DENSITY_G_PER_ML)) {
-    if (n.includes(word) && word.length > bestLen) {
-      best = density;
-      bestLen = word.length;
-    }
+  for (const [word, density] of DENSITY_WORDS) {
+    if (n.includes(word)) return density;
   }
-  return best;
+  return 1.0;
 }
 
 /** Same longest-word-wins lookup, for per-piece weights. */
 export function pieceWeightFor(name: string): number {
   const n = name.toLowerCase().replace(/\s+/g, "");
-  let best = PIECE_DEFAULT_G;
-  let bestLen = 0;
-  for (const [word, grams] of Object.entries(PIECE_WEIGHTS)) {
-    if (n.includes(word) && word.length > bestLen) {
-      best = grams;
-      bestLen = word.length;
-    }
+  for (const [word, grams] of PIECE_WORDS) {
+    if (n.includes(word)) return grams;
   }
-  return best;
+  return PIECE_DEFAULT_G;
 }
 
 /**
@@ -172,6 +172,26 @@ interface CandidateLoopOptions {
    * op 0.9-1.1x, zodat een "origineel"-optie ook echt nauwelijks herschaald is.
    */
   pinNearFit: boolean;
+  /** Gedeeld over de momenten van één dag; zie `CandidateCache`. */
+  cache?: CandidateCache;
+}
+
+/**
+ * Wat de kandidatenloop al uit de database haalde. De kcal-banden van de
+ * momenten op een dag overlappen ruim, dus het diner krijgt grotendeels
+ * dezelfde recepten voorgeschoteld als de lunch; die hoeven dan niet opnieuw
+ * opgehaald, en hun productmatches ook niet.
+ */
+interface CandidateCache {
+  /** Null: het recept bestaat niet (meer). */
+  recipes: Map<string, Recipe | null>;
+  matches: Map<string, ProductMatch>;
+  /** Namen waarvoor de matches al zijn opgevraagd, ook als er geen was. */
+  matchedNames: Set<string>;
+}
+
+function candidateCache(): CandidateCache {
+  return { recipes: new Map(), matches: new Map(), matchedNames: new Set() };
 }
 
 /**
@@ -208,15 +228,25 @@ async function planCandidates(
   // verzamelen, zodat één query alle onthouden productmatches levert — niet één
   // lookup per kandidaat per ingredient. De matchMap-achtige lookup is zuiver
   // databasewerk, dus plannen raakt ah.nl er niet door aan.
+  const cache = options.cache ?? candidateCache();
+  // Wat de cache nog niet kent in één query, niet één `getRecipe` per kandidaat.
+  const missing = candidates.map((c) => c.id).filter((id) => !cache.recipes.has(id));
+  const fetched = missing.length > 0 ? await store.getRecipes(missing) : new Map<string, Recipe>();
+  for (const id of missing) cache.recipes.set(id, fetched.get(id) ?? null);
   const recipes = new Map<string, Recipe>();
   const names = new Set<string>();
   for (const candidate of candidates) {
-    const recipe = await store.getRecipe(candidate.id);
+    const recipe = cache.recipes.get(candidate.id);
     if (!recipe || recipe.ingredients.length === 0) continue;
     recipes.set(candidate.id, recipe);
-    for (const ingredient of recipe.ingredients) names.add(ingredient.name.toLowerCase());
+    for (const ingredient of recipe.ingredients) {
+      const name = ingredient.name.toLowerCase();
+      if (!cache.matchedNames.has(name)) names.add(name);
+    }
   }
-  const allMatches = await store.productMatchesFor([...names]);
+  for (const [name, match] of await store.productMatchesFor([...names])) cache.matches.set(name, match);
+  for (const name of names) cache.matchedNames.add(name);
+  const allMatches = cache.matches;
 
   for (const candidate of candidates) {
     const recipe = recipes.get(candidate.id);
@@ -381,6 +411,7 @@ export async function generateDay(
 
   // Wat de al geplande momenten te weinig (positief) of te veel opleverden.
   const carry: DailyTargets = { kcal: 0, protein: 0, carbs: 0, fat: 0, fiber: 0 };
+  const cache = candidateCache();
 
   for (const [index, entry] of base.entries()) {
     const slotsLeft = base.length - index;
@@ -409,6 +440,7 @@ export async function generateDay(
       slotTags: entry.slot.tags,
       portions,
       pinNearFit: false,
+      cache,
     });
 
     const count = Math.min(Math.max(options.optionsPerMeal ?? 4, 1), 6);
@@ -8,6 +8,7 @@ import {
   runAutoIngest,
   setAutoPaused,
 } from "../src/ingest/auto";
+import { completeRecipeIds, ingestComplete, reparseArchive } from "../src/ingest/pipeline";
 import { createTestDb, type TestDb } from "./helpers/d1";
 
 /**
@@ -197,6 +198,84 @@ describe("een ronde", () => {
     expect(calls.filter((c) => c.includes("/allerhande/recept/"))).toHaveLength(5);
   });
 
+  it("haalt niet één pagina te veel op terwijl het vorige recept nog wordt opgeslagen", async () => {
+    const calls = stubAh({ ids: ["R-R101", "R-R102", "R-R103", "R-R104", "R-R105"] });
+    const env = envFor();
+
+    const result = await runAutoIngest(env, { ...fastConfig, batch: 2 });
+
+    expect(result.added).toBe(2);
+    expect(calls.filter((c) => c.includes("/allerhande/recept/"))).toHaveLength(2);
+    expect(await new Store(env.DB).countRecipes()).toBe(2);
+  });
+
+  it("schrijft opgehaalde recepten per tien in één batch weg", async () => {
+    const ids = Array.from({ length: 12 }, (_, i) => `R-R${400 + i}`);
+    stubAh({ ids });
+    const env = envFor();
+    let recipeBatches = 0;
+    const batch = env.DB.batch.bind(env.DB);
+    env.DB.batch = async (statements) => {
+      const sql = statements.map((st) => (st as unknown as { sql: string }).sql);
+      if (sql.some((q) => q.includes("INSERT INTO recipes"))) recipeBatches++;
+      return await batch(statements);
+    };
+
+    const result = await ingestComplete(env, ["ontbijt"], 12, {
+      minIntervalMs: 0,
+      backoffMs: 0,
+      maxRequests: 40,
+    });
+
+    expect(result.added).toBe(12);
+    expect(recipeBatches).toBe(2);
+    expect(await new Store(env.DB).countRecipes()).toBe(12);
+  });
+
+  it("vraagt D1 niet opnieuw naar recepten die een eerdere zoekterm al opleverde", async () => {
+    // Elke zoekterm geeft hier dezelfde twee recepten terug.
+    stubAh();
+    const env = envFor();
+    const lookups: string[] = [];
+    const prepare = env.DB.prepare.bind(env.DB);
+    env.DB.prepare = (sql: string) => {
+      if (sql.includes("FROM skipped_recipes WHERE id IN")) lookups.push(sql);
+      return prepare(sql);
+    };
+
+    const result = await ingestComplete(env, ["ontbijt", "lunch", "diner"], 10, {
+      minIntervalMs: 0,
+      backoffMs: 0,
+      maxRequests: 40,
+    });
+
+    expect(result.added).toBe(2);
+    expect(lookups).toHaveLength(1);
+  });
+
+  it("slaat losse recepten allemaal op, ook het laatste dat nog onderweg was", async () => {
+    const calls = stubAh();
+    const env = envFor();
+    await new Store(env.DB).skipRecipe("R-R102", "geen voedingswaarde op de receptpagina");
+
+    await completeRecipeIds(env, ["R-R101", "R-R102", "R-R103"], { minIntervalMs: 0, backoffMs: 0 });
+
+    const store = new Store(env.DB);
+    expect(await store.countRecipes()).toBe(2);
+    expect(await store.getRecipe("R-R103")).not.toBeNull();
+    expect(calls.filter((c) => c.includes("/allerhande/recept/"))).toHaveLength(2);
+  });
+
+  it("legt een mislukt los recept vast in de log in plaats van het in te slikken", async () => {
+    stubAh({ blockDetails: true });
+    const env = envFor();
+
+    await completeRecipeIds(env, ["R-R101"], { minIntervalMs: 0, backoffMs: 0 });
+
+    const logs = await new Store(env.DB).recentLogs(20);
+    expect(logs.some((l) => l.level === "error" && l.message === "recept R-R101 mislukt")).toBe(true);
+  });
+
   it("haalt een afgekeurd recept nooit opnieuw op", async () => {
     stubAh({ nutrition: null });
     const env = envFor();
@@ -411,6 +490,28 @@ describe("de eenmalige opruiming", () => {
   });
 });
 
+describe("reparseArchive", () => {
+  it("bouwt recepten uit het archief op en schrijft ze in batches weg", async () => {
+    const env = envFor();
+    const store = new Store(env.DB);
+    const archive = (ref: string, body: string) =>
+      store.putRaw({ kind: "recipe", ref, url: `https://www.ah.nl/allerhande/recept/${ref}`, status: 200, body });
+    const ids = Array.from({ length: 30 }, (_, i) => `R-R${200 + i}`);
+    for (const id of ids) await archive(id, recipePage(id, "ontbijt", ["100 g havermout"], DEFAULT_NUTRITION));
+    await archive("R-R300", recipePage("R-R300", "ontbijt", ["100 g havermout"]));
+    await archive("R-R301", "<html>niets</html>");
+
+    const result = await reparseArchive(store, 100);
+
+    expect(result.examined).toBe(32);
+    expect(result.recovered).toBe(30);
+    expect(result.failed.sort()).toEqual(["R-R300", "R-R301"]);
+    expect(await store.countRecipes()).toBe(30);
+    expect(await store.countSkippedRecipes()).toBe(1);
+    expect((await store.countRaw()).unparsed).toBe(2);
+  });
+});
+
 describe("autoStatus", () => {
   it("vertelt wat er vandaag binnenkwam en wat er klaarstaat", async () => {
     stubAh();
@@ -106,6 +106,25 @@ describe("generateDay", () => {
     expect(new Set(ids).size).toBe(ids.length);
   });
 
+  it("loads each candidate recipe once per day, however many slots it is offered to", async () => {
+    const store = await storeWithLibrary();
+    const loaded: string[] = [];
+    let queries = 0;
+    const getRecipes = store.getRecipes.bind(store);
+    store.getRecipes = async (ids: string[]) => {
+      queries++;
+      loaded.push(...ids);
+      return await getRecipes(ids);
+    };
+
+    await generateDay(store, client, { date: "2026-08-01", slots: DEFAULT_SLOTS, daily });
+
+    expect(loaded.length).toBeGreaterThan(0);
+    expect(new Set(loaded).size).toBe(loaded.length);
+    // Hooguit één query per moment, niet één per kandidaat.
+    expect(queries).toBeLessThanOrEqual(DEFAULT_SLOTS.length);
+  });
+
   it("lands the whole day near the target rather than each slot separately", async () => {
     const store = await storeWithLibrary();
     const day = await generateDay(store, client, {
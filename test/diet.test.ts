@@ -1,6 +1,14 @@
 import { describe, expect, it } from "vitest";
 import type { Recipe } from "../src/ah/types";
-import { deriveTags, forbiddenTags, matchesDiet } from "../src/nutrition/diet";
+import {
+  DIET_BITS,
+  deriveTags,
+  dietMask,
+  forbiddenMask,
+  forbiddenTags,
+  matchesDiet,
+  momentOf,
+} from "../src/nutrition/diet";
 
 const recipe = (title: string, ...names: string[]): Recipe => ({
   id: "R-R1",
@@ -62,6 +70,24 @@ describe("deriveTags", () => {
   });
 });
 
+describe("momentOf", () => {
+  const MOMENTS = ["ontbijt", "lunch", "snack", "diner"];
+
+  it("gives the same moment as the first moment label from deriveTags", () => {
+    const cases: Recipe[] = [
+      recipe("Havermout met kwark", "havermout"),
+      recipe("Kip curry met rijst", "kipfilet"),
+      { ...recipe("Broodje gezond", "volkorenbrood"), keywords: ["tussendoortje", "lunch"] },
+      { ...recipe("Wrap met zalm", "tortilla"), keywords: ["vegetarisch"] },
+      recipe("Iets zonder aanwijzing", "water"),
+    ];
+    for (const r of cases) {
+      const expected = deriveTags(r).find((tag) => MOMENTS.includes(tag)) ?? null;
+      expect(momentOf(r), r.title).toBe(expected);
+    }
+  });
+});
+
 describe("forbiddenTags", () => {
   it("collects the tags a set of diets rules out", () => {
     expect(forbiddenTags(["vegetarisch"]).sort()).toEqual(["varken", "vis", "vlees"]);
@@ -79,6 +105,20 @@ describe("forbiddenTags", () => {
   });
 });
 
+describe("dietMask", () => {
+  it("turns tags into bits and skips tags without one", () => {
+    expect(dietMask(["vlees", "varken", "diner"])).toBe(DIET_BITS.vlees! | DIET_BITS.varken!);
+    expect(dietMask([])).toBe(0);
+  });
+
+  it("matches a recipe exactly when its tags overlap the forbidden mask", () => {
+    const { mask, rest } = forbiddenMask(["vegetarisch"]);
+    expect(rest).toEqual([]);
+    expect(dietMask(tagsOf("Kip met rijst", "kipfilet")) & mask).not.toBe(0);
+    expect(dietMask(tagsOf("Pasta", "mozzarella")) & mask).toBe(0);
+  });
+});
+
 describe("matchesDiet", () => {
   it("rejects a recipe that carries a forbidden tag", () => {
     expect(matchesDiet(["vlees", "diner"], ["vegetarisch"])).toBe(false);
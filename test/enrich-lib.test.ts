@@ -5,7 +5,7 @@ import { join } from "node:path";
 import { Store } from "../src/db/queries";
 import type { Recipe } from "../src/ah/types";
 import { createTestDb, type TestDb } from "./helpers/d1";
-import { enrichOneRecipe, findLocalDb, isRecipeDone, markRecipeDone, needsEnrichment, openIngredientNames } from "../scripts/enrich-lib.mjs";
+import { doneRecipeIds, enrichOneRecipe, findLocalDb, isRecipeDone, markRecipeDone, needsEnrichment, openIngredientNames } from "../scripts/enrich-lib.mjs";
 
 /**
  * De gedeelde script-logica voor lokale productverrijking
@@ -208,6 +208,22 @@ describe("openIngredientNames", () => {
     const open = await openIngredientNames(store, RECEPT);
     expect(open).toContain("biologische kikkererwten");
   });
+
+  it("geeft met een vooraf opgehaalde set hetzelfde antwoord, zonder query", async () => {
+    const store = testDb();
+    await store.putMatch("biologische kikkererwten", "168813", 1);
+    await store.putMatch("verse basilicum", null, 1);
+    const linked = await store.linkedIngredientNames();
+    const matchMap = store.matchMap.bind(store);
+    let lookups = 0;
+    store.matchMap = async (names) => {
+      lookups++;
+      return await matchMap(names);
+    };
+
+    expect(await openIngredientNames(store, RECEPT, linked)).toEqual(["verse basilicum"]);
+    expect(lookups).toBe(0);
+  });
 });
 
 describe("de klaar-markering", () => {
@@ -243,6 +259,15 @@ describe("de klaar-markering", () => {
     expect(await isRecipeDone(store, "R-R1202157")).toBe(true);
     expect(await isRecipeDone(store, "R-R9999999")).toBe(false);
   });
+
+  it("doneRecipeIds geeft alle gemarkeerde recepten in één keer, zonder andere state", async () => {
+    const store = testDb();
+    await markRecipeDone(store, "R-R1202157");
+    await markRecipeDone(store, "R-R1202158");
+    await store.setState("auto:cursor", "3");
+
+    expect([...(await doneRecipeIds(store))].sort()).toEqual(["R-R1202157", "R-R1202158"]);
+  });
 });
 
 describe("enrichOneRecipe", () => {
@@ -290,6 +315,23 @@ describe("enrichOneRecipe", () => {
     expect(calls.filter((c) => c.query.includes("nutrients"))).toHaveLength(1);
   });
 
+  it("vraagt de voorgestelde producten in één keer op, niet per product", async () => {
+    const store = testDb();
+    await store.putProduct({ webshopId: "168813", title: "al bekend", salesUnitSize: null, per100g: {} });
+    const getProduct = store.getProduct.bind(store);
+    let losse = 0;
+    store.getProduct = async (id) => {
+      losse++;
+      return await getProduct(id);
+    };
+    const { ctx } = fakeCurl(standaardHandler());
+
+    const line = await enrichOneRecipe(store, ctx, RECEPT);
+
+    expect(line).toEqual({ gekoppeld: 2, nieuw: 1, cached: 1, fouten: 0 });
+    expect(losse).toBe(0);
+  });
+
   it("volgt de bundel-variant als een product geen tradeItem heeft", async () => {
     const store = testDb();
     const { ctx, calls } = fakeCurl(
@@ -412,6 +454,54 @@ describe("enrichOneRecipe", () => {
     expect(await store.getProduct("999999")).toBeNull();
   });
 
+  it("bewaart wat al opgehaald is als het recept halverwege afbreekt", async () => {
+    const store = testDb();
+    const { ctx } = fakeCurl((query, variables) => {
+      if (query.includes("recipeProductSuggestionsV2")) return SUGGESTIES_EEN_REGEL;
+      if (query.includes("productSearch")) {
+        return {
+          data: {
+            productSearch: {
+              products: [{ id: 611642, title: "AH Basilicum", brand: "AH", webPath: "/producten/product/wi611642", salesUnitSize: "60 g" }],
+            },
+          },
+        };
+      }
+      return VOEDING(Number(variables["id"]));
+    });
+    // De zoektreffer wordt los opgevraagd; daar gaat het mis.
+    const getProduct = store.getProduct.bind(store);
+    store.getProduct = async () => {
+      throw new Error("database weg");
+    };
+
+    await expect(enrichOneRecipe(store, ctx, RECEPT)).rejects.toThrow("database weg");
+    store.getProduct = getProduct;
+    // Het product van de eerste regel was al opgehaald en staat er dus.
+    expect((await store.getProduct("168813"))?.per100g).toEqual({ kcal: 120, protein: 6.5 });
+    expect(await store.matchMap(["biologische kikkererwten"])).toEqual({ "biologische kikkererwten": "168813" });
+  });
+
+  it("houdt de koppeling als het ophalen van een product halverwege mislukt", async () => {
+    const store = testDb();
+    const { ctx } = fakeCurl((query, variables) => {
+      if (query.includes("recipeProductSuggestionsV2")) return SUGGESTIES_BODY;
+      if (Number(variables["id"]) === 611642) throw new Error("curl.exe eindigde met status 28");
+      return VOEDING(Number(variables["id"]));
+    });
+
+    const line = await enrichOneRecipe(store, ctx, RECEPT);
+
+    expect(line).toEqual({ gekoppeld: 2, nieuw: 1, cached: 0, fouten: 1 });
+    // Beide koppelingen staan; alleen het opgehaalde product staat erbij.
+    expect(await store.matchMap(["biologische kikkererwten", "verse basilicum"])).toEqual({
+      "biologische kikkererwten": "168813",
+      "verse basilicum": "611642",
+    });
+    expect(await store.getProduct("168813")).not.toBeNull();
+    expect(await store.getProduct("611642")).toBeNull();
+  });
+
   it("laat een regel open zonder fout als de zoekquery geen resultaten geeft", async () => {
     const store = testDb();
     const { ctx } = fakeCurl((query, variables) => {
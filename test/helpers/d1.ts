@@ -85,6 +85,13 @@ export interface TestDb extends D1Database {
   close(): void;
 }
 
+/**
+ * schema.sql, read once per test file rather than once per database, and
+ * applied as a single transaction: either the whole schema is there or the
+ * test fails on the statement that broke.
+ */
+const SCHEMA = `BEGIN;\n${readFileSync(join(repoRoot, "schema.sql"), "utf8")}\nCOMMIT;`;
+
 /**
  * Fresh in-memory database with the production schema applied. Uses schema.sql
  * itself, so a table that is missing there will fail the tests rather than only
@@ -92,13 +99,21 @@ export interface TestDb extends D1Database {
  */
 export function createTestDb(): TestDb {
   const db = new DatabaseSync(":memory:");
-  db.exec(readFileSync(join(repoRoot, "schema.sql"), "utf8"));
+  db.exec(SCHEMA);
 
   const api = {
     prepare: (sql: string) => new MockPreparedStatement(db, sql),
+    /** D1 runs a batch as one transaction: either every statement lands or none. */
     async batch(statements: MockPreparedStatement[]) {
       const out = [];
-      for (const statement of statements) out.push(await statement.run());
+      db.exec("BEGIN");
+      try {
+        for (const statement of statements) out.push(await statement.run());
+        db.exec("COMMIT");
+      } catch (err) {
+        db.exec("ROLLBACK");
+        throw err;
+      }
       return out;
     },
     async exec(sql: string) {
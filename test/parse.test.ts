@@ -4,6 +4,7 @@ import {
   parseIngredientText,
   parseNutrition,
   parseNutritionHtml,
+  parseProductDetail,
   parseRecipeCards,
   productIdFrom,
 } from "../src/ah/client";
@@ -21,6 +22,25 @@ describe("extractEmbeddedJson", () => {
     expect(extractEmbeddedJson(html)).toEqual([{ a: 1 }, { b: 2 }]);
   });
 
+  it("vindt op elke volgende pagina weer alles, ook met gedeelde patronen", () => {
+    const html = `<script type="application/ld+json">{"a":1}</script>`;
+    expect(extractEmbeddedJson(html)).toEqual([{ a: 1 }]);
+    expect(extractEmbeddedJson(html)).toEqual([{ a: 1 }]);
+  });
+
+  it("keeps state blobs in a fixed order whatever order the tags come in", () => {
+    const html = `<script>window.__INITIAL_STATE__ = {"c":3};</script>
+                  <script type="application/ld+json">{"b":2}</script>
+                  <script id="__NEXT_DATA__" type="application/json">{"a":1}</script>`;
+    expect(extractEmbeddedJson(html)).toEqual([{ a: 1 }, { b: 2 }, { c: 3 }]);
+  });
+
+  it("leest ook een blob met een BOM of NBSP eromheen, wat JSON.parse zelf niet overslaat", () => {
+    const html = `<script id="__NEXT_DATA__" type="application/json">\uFEFF{"a":1}</script>
+                  <script type="application/ld+json">\u00A0{"b":2}\u00A0\u2028</script>`;
+    expect(extractEmbeddedJson(html)).toEqual([{ a: 1 }, { b: 2 }]);
+  });
+
   it("skips unparseable blocks instead of throwing", () => {
     const html = `<script id="__NEXT_DATA__">not json</script>`;
     expect(extractEmbeddedJson(html)).toEqual([]);
@@ -121,6 +141,21 @@ describe("parseNutrition", () => {
     expect(parseNutrition({ title: "AH Kipfilet" })).toEqual({});
   });
 
+  it("stopt met zoeken zodra alle vijf de waarden gevonden zijn", () => {
+    const payload = {
+      rows: [
+        { name: "Energie", value: "250 kcal" },
+        { name: "Eiwitten", value: "31 g" },
+        { name: "Koolhydraten", value: "0 g" },
+        { name: "Vetten", value: "3,6 g" },
+        { name: "Vezels", value: "2 g" },
+      ],
+      // Kan het antwoord niet meer veranderen: de eerste waarde per sleutel wint.
+      related: [{ name: "Eiwitten", value: "99 g" }],
+    };
+    expect(parseNutrition(payload)).toEqual({ kcal: 250, protein: 31, carbs: 0, fat: 3.6, fiber: 2 });
+  });
+
   it("takes kcal rather than kJ from a combined energy value", () => {
     expect(parseNutrition({ rows: [{ name: "Energie", value: "538 kJ (128 kcal)" }] }).kcal).toBe(
       128,
@@ -128,6 +163,32 @@ describe("parseNutrition", () => {
   });
 });
 
+describe("parseProductDetail", () => {
+  it("vindt kaart en voedingswaarde in één keer, met dezelfde kaart als deepFind", () => {
+    const body = {
+      card: { webshopId: 1, title: "AH Kipfilet" },
+      nutrition: [{ name: "Eiwitten", value: "31 g" }],
+      related: [{ webshopId: 2, title: "AH Kalkoenfilet" }],
+    };
+    const { card, per100g } = parseProductDetail(body);
+
+    const isCard = (v: unknown) => typeof v === "object" && v !== null && "webshopId" in v && "title" in v;
+    expect(card).toBe(deepFind(body, isCard));
+    expect(per100g).toEqual(parseNutrition(body));
+    expect(per100g).toEqual({ protein: 31 });
+  });
+
+  it("loopt ook een heel diep geneste respons af zonder de stack te laten overlopen", () => {
+    let body: unknown = { nutrition: [{ name: "Eiwitten", value: "31 g" }] };
+    for (let i = 0; i < 50_000; i++) body = { children: [body] };
+    body = { webshopId: 1, title: "AH Kipfilet", detail: body };
+
+    const { card, per100g } = parseProductDetail(body);
+    expect(card?.["title"]).toBe("AH Kipfilet");
+    expect(per100g).toEqual({ protein: 31 });
+  });
+});
+
 describe("parseNutritionHtml", () => {
   it("reads AH's current product-page table", () => {
     const html = `<table data-testid="nutrition-table"><tbody>
@@ -143,6 +204,27 @@ describe("parseNutritionHtml", () => {
       protein: 19,
     });
   });
+
+  it("vindt de tabel ook achter andere tabellen op de pagina", () => {
+    const html = `<table class="specs"><tr><td>Eiwitten</td><td>99 g</td></tr></table>
+      <div><table class="x" data-testid="nutrition-table"><tbody>
+      <tr><td>Eiwitten</td><td>19 g</td></tr>
+    </tbody></table></div>`;
+    expect(parseNutritionHtml(html)).toEqual({ protein: 19 });
+  });
+
+  it("vult alleen aan wat al bekend was en laat de rest staan", () => {
+    const html = `<table data-testid="nutrition-table"><tbody>
+      <tr><td>Energie</td><td>538 kJ (128 kcal)</td></tr>
+      <tr><td>Vet</td><td>4,5 g</td></tr>
+      <tr><td>Eiwitten</td><td>19 g</td></tr>
+    </tbody></table>`;
+    expect(parseNutritionHtml(html, { kcal: 130, fat: 5 })).toMatchObject({
+      kcal: 130,
+      fat: 5,
+      protein: 19,
+    });
+  });
 });
 
 describe("toProductStub", () => {
@@ -160,6 +242,12 @@ describe("toProductStub", () => {
 });
 
 describe("collectRecipes", () => {
+  it("loopt ook een heel diep geneste payload af zonder de stack te laten overlopen", () => {
+    let payload: unknown = { id: "R-R1", title: "Diep recept", href: "/allerhande/recept/R-R1/diep" };
+    for (let i = 0; i < 50_000; i++) payload = { children: [payload] };
+    expect(collectRecipes(payload).map((r) => r.id)).toEqual(["R-R1"]);
+  });
+
   it("finds recipes wherever they sit in the payload", () => {
     const payload = {
       props: {
@@ -242,6 +330,13 @@ describe("parseRecipeCards", () => {
       },
     ]);
   });
+
+  it("vertaalt elke entity één keer, ook als er een &amp; in zit", () => {
+    const html = `<a title="Recept: Pasta &amp; pesto &#233;&#xE9; met &amp;lt;3"
+      data-testid="recipe-card"
+      href="/allerhande/recept/R-R1202673/pasta"></a>`;
+    expect(parseRecipeCards(html)[0]?.title).toBe("Pasta & pesto éé met &lt;3");
+  });
 });
 
 describe("productkoppeling per ingredient", () => {
@@ -259,6 +354,14 @@ describe("productkoppeling per ingredient", () => {
     expect(extractFlightJson(html)).toEqual([{ a: 1 }]);
   });
 
+  it("vindt de flight-chunks ook via extractEmbeddedJson, uit dezelfde scan over de scripts", () => {
+    const html =
+      `<script>self.__next_f.push([1,${JSON.stringify('4:{"a":')}])</script>` +
+      `<script type="application/ld+json">{"b":2}</script>` +
+      `<script>self.__next_f.push([1,${JSON.stringify("1}\n")}])</script>`;
+    expect(extractEmbeddedJson(html)).toEqual([{ a: 1 }, { b: 2 }]);
+  });
+
   it("neemt het webshop-id over dat AH zelf aan de receptregel hangt", () => {
     const [recipe] = collectRecipes({
       id: 42,
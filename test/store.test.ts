@@ -37,6 +37,17 @@ describe("recipe storage", () => {
     expect(stored?.ingredients).toEqual([{ name: "kipfilet", quantity: 400, unit: "g" }]);
   });
 
+  it("reads a whole set of recipes back at once, skipping unknown ids", async () => {
+    const store = freshStore();
+    await store.putRecipe(recipe());
+    await store.putRecipe(recipe({ id: "R-R2", title: "Zalm", keywords: ["diner"] }));
+    const stored = await store.getRecipes(["R-R2", "R-R1", "R-R9"]);
+
+    expect([...stored.keys()].sort()).toEqual(["R-R1", "R-R2"]);
+    expect(stored.get("R-R2")).toEqual(await store.getRecipe("R-R2"));
+    expect(await store.getRecipes([])).toEqual(new Map());
+  });
+
   it("never lets a failed rescrape wipe an ingredient list", async () => {
     const store = freshStore();
     await store.putRecipe(recipe());
@@ -99,6 +110,46 @@ describe("recipe storage", () => {
     expect((await store.getRecipe("R-R1"))?.nutritionPerServing).toEqual({ kcal: 520 });
   });
 
+  it("zet een compleet recept met zijn voedingswaarde in één keer neer", async () => {
+    const store = freshStore();
+    await store.putCompleteRecipe(recipe(), { kcal: 1200, protein: 90 });
+
+    const { rows } = await store.listRecipes();
+    expect(rows).toHaveLength(1);
+    expect(rows[0]?.nutrition?.kcal).toBe(1200);
+    expect(rows[0]?.coverage).toBe(1);
+  });
+
+  it("schrijft de logregel bij opslaan of afkeuren in dezelfde batch mee", async () => {
+    const store = freshStore();
+    await store.putCompleteRecipe(recipe(), { kcal: 1200 }, { level: "info", source: "ingest", message: "opgeslagen" });
+    await store.skipRecipe("R-R2", "geen voedingswaarde", { level: "info", source: "ingest", message: "afgekeurd" });
+
+    expect(await store.countRecipes()).toBe(1);
+    expect(await store.countSkippedRecipes()).toBe(1);
+    expect((await store.recentLogs(10)).map((l) => l.message).sort()).toEqual(["afgekeurd", "opgeslagen"]);
+  });
+
+  it("schrijft een reeks recepten en afkeuringen in één batch", async () => {
+    const store = freshStore();
+    let batches = 0;
+    const batch = db!.batch.bind(db!);
+    db!.batch = async (statements) => {
+      batches++;
+      return await batch(statements);
+    };
+    await store.putRecipeWrites([
+      { recipe: recipe(), total: { kcal: 1200 }, entry: { level: "info", source: "ingest", message: "opgeslagen" } },
+      { recipe: recipe({ id: "R-R3" }), total: { kcal: 800 } },
+      { skip: "R-R2", reason: "geen voedingswaarde" },
+    ]);
+
+    expect(batches).toBe(1);
+    expect(await store.countRecipes()).toBe(2);
+    expect(await store.countSkippedRecipes()).toBe(1);
+    expect((await store.recentLogs(10)).map((l) => l.message)).toEqual(["opgeslagen"]);
+  });
+
   it("derives tags so the diet filter has something to work with", async () => {
     const store = freshStore();
     await store.putRecipe(recipe());
@@ -130,6 +181,20 @@ describe("scrape archive", () => {
     expect(counts.unparsed).toBe(2);
   });
 
+  it("slaat een ongewijzigde payload niet nog een keer op", async () => {
+    const store = freshStore();
+    await store.putRaw(raw);
+    await new Promise((resolve) => setTimeout(resolve, 5));
+    await store.putRaw(raw);
+    await new Promise((resolve) => setTimeout(resolve, 5));
+    // Een blokkade telt wél elke keer: daar wil je elke poging van zien.
+    await store.putRaw({ ...raw, status: 403, body: "geblokkeerd" });
+    await new Promise((resolve) => setTimeout(resolve, 5));
+    await store.putRaw({ ...raw, status: 403, body: "geblokkeerd" });
+
+    expect((await store.countRaw()).total).toBe(3);
+  });
+
   it("hands back the most recent payload for a reference", async () => {
     const store = freshStore();
     await store.putRaw(raw);
@@ -152,6 +217,19 @@ describe("scrape archive", () => {
     expect(rows.find((r) => r.ref === "R-R1")?.body).toBe("<html>nieuwer</html>");
   });
 
+  it("streams the payloads page by page, in the same order", async () => {
+    const store = freshStore();
+    for (const ref of ["R-R1", "R-R2", "R-R3"]) {
+      await store.putRaw({ ...raw, ref, body: `<html>${ref}</html>` });
+      await new Promise((resolve) => setTimeout(resolve, 5));
+    }
+
+    const streamed: string[] = [];
+    for await (const row of store.eachLatestRaw("recipe", 10, 2)) streamed.push(row.body);
+    expect(streamed).toEqual((await store.latestRawPerRef("recipe", 10)).map((r) => r.body));
+    expect(streamed).toHaveLength(3);
+  });
+
   it("records that a payload parsed, so reparse can skip it", async () => {
     const store = freshStore();
     await store.putRaw(raw);
@@ -160,6 +238,29 @@ describe("scrape archive", () => {
 
     expect((await store.countRaw()).unparsed).toBe(0);
   });
+
+  it("marks a whole reparse round in one batch", async () => {
+    const store = freshStore();
+    await store.putRaw(raw);
+    await store.putRaw({ ...raw, ref: "R-R2" });
+    const rows = await store.latestRawPerRef("recipe", 10);
+    await store.markRawParsedMany([
+      { id: rows[0]!.id, ok: true, error: null },
+      { id: rows[1]!.id, ok: false, error: "kapot" },
+    ]);
+
+    expect((await store.countRaw()).unparsed).toBe(1);
+  });
+
+  it("legt een opgehaalde pagina met zijn logregel in één keer vast", async () => {
+    const store = freshStore();
+    await store.recordFetch(raw, true, "info", "recipe R-R1 -> 200", { bytes: raw.body.length });
+    await store.recordFetch({ ...raw, kind: "product", ref: "wi1" }, false, "warn", "product wi1 -> 403");
+
+    expect((await store.countRaw()).total).toBe(1);
+    const logs = await store.recentLogs(10);
+    expect(logs.map((l) => l.message).sort()).toEqual(["product wi1 -> 403", "recipe R-R1 -> 200"]);
+  });
 });
 
 describe("profile", () => {
@@ -209,6 +310,15 @@ describe("meal slots", () => {
     const slots = await store.getSlots();
     expect(slots.map((s) => s.id)).toEqual(["ontbijt", "diner"]);
   });
+
+  it("laat de oude indeling staan als het vervangen halverwege misgaat", async () => {
+    const store = freshStore();
+    await store.getSlots();
+    // Twee keer hetzelfde id: de tweede insert faalt op de primary key.
+    await expect(store.putSlots([DEFAULT_SLOTS[0]!, DEFAULT_SLOTS[0]!])).rejects.toThrow();
+
+    expect(await store.getSlots()).toEqual(DEFAULT_SLOTS);
+  });
 });
 
 describe("saved days", () => {
@@ -251,6 +361,16 @@ describe("saved days", () => {
     expect(days.map((d) => d.date)).toEqual(["2026-08-01", "2026-08-05"]);
   });
 
+  it("gives every listed day its own meals, in order", async () => {
+    const store = freshStore();
+    await store.saveDay(day);
+    await store.saveDay({ ...day, date: "2026-08-03", meals: [day.meals[1]!] });
+    await store.saveDay({ ...day, date: "2026-08-04", meals: [] });
+
+    const days = await store.listDays("2026-08-01", "2026-08-07");
+    expect(days.map((d) => d.meals.map((m) => m.recipeId))).toEqual([["R-R1", "R-R3"], ["R-R3"], []]);
+  });
+
   it("takes the meals with it when a day is deleted", async () => {
     const store = freshStore();
     const id = await store.saveDay(day);
@@ -282,6 +402,12 @@ describe("preferences and exclusions", () => {
     await store.putExclusions([" Banaan ", "banaan", "", "Kokos"]);
     expect(await store.getExclusions()).toEqual(["banaan", "kokos"]);
   });
+
+  it("geeft bij het opslaan terug wat er daarna uit te lezen valt", async () => {
+    const store = freshStore();
+    const stored = await store.putExclusions([" Kokos ", "banaan", "Banaan"]);
+    expect(stored).toEqual(await store.getExclusions());
+  });
 });
 
 describe("shortlistForSlot", () => {
@@ -313,6 +439,18 @@ describe("shortlistForSlot", () => {
     expect(ids).not.toContain("R-R3");
   });
 
+  it("sluit een ingredient uit ongeacht hoofdletters, in de term of in het recept", async () => {
+    const store = await seeded();
+    await seedRecipes(store, [
+      { id: "R-R7", title: "Grote kwark", ingredients: [{ name: "Kwark", grams: 300, per100g: FOODS.kwark! }] },
+    ]);
+
+    const ids = async (excludedTerms: string[]) =>
+      (await store.shortlistForSlot({ kcalPerPortion: 0, excludedTerms })).map((c) => c.id).sort();
+    expect(await ids(["RIJST"])).toEqual(["R-R1", "R-R7"]);
+    expect(await ids(["kwark"])).toEqual(["R-R3"]);
+  });
+
   it("marks favourites so the planner can prefer them", async () => {
     const store = await seeded();
     await store.setPref("R-R1", "fav");
@@ -371,6 +509,89 @@ describe("productMap", () => {
     });
     expect(await store.productMap([])).toEqual({});
   });
+
+  it("bewaart een reeks producten en koppelingen in één batch", async () => {
+    const store = freshStore();
+    await store.putProduct({ webshopId: "wi-1", title: "Oud", salesUnitSize: null, per100g: {} });
+    await store.putProducts([
+      { webshopId: "wi-1", title: "Kikkererwten", salesUnitSize: "330 g", per100g: { kcal: 120 } },
+      { webshopId: "wi-2", title: "Melk", salesUnitSize: "1 l", per100g: {} },
+    ]);
+    await store.putMatches([
+      { ingredientName: "kikkererwten", webshopId: "wi-1", score: 1 },
+      { ingredientName: "melk", webshopId: "wi-2", score: 0.8 },
+    ]);
+
+    expect((await store.getProduct("wi-1"))?.per100g).toEqual({ kcal: 120 });
+    expect(await store.matchMap(["kikkererwten", "melk"])).toEqual({ kikkererwten: "wi-1", melk: "wi-2" });
+  });
+
+  it("schrijft producten en hun koppelingen samen in één batch", async () => {
+    const store = freshStore();
+    let batches = 0;
+    const batch = db!.batch.bind(db!);
+    db!.batch = async (list) => {
+      batches++;
+      return await batch(list);
+    };
+    await store.putProductsAndMatches(
+      [{ webshopId: "wi-1", title: "Kikkererwten", salesUnitSize: "330 g", per100g: { kcal: 120 } }],
+      [
+        { ingredientName: "kikkererwten", webshopId: "wi-1", score: 1 },
+        { ingredientName: "zout", webshopId: null, score: 0 },
+      ],
+    );
+    await store.putProductsAndMatches([], []);
+
+    expect(batches).toBe(1);
+    expect(await store.matchMap(["kikkererwten", "zout"])).toEqual({ kikkererwten: "wi-1" });
+    expect((await store.getProduct("wi-1"))?.title).toBe("Kikkererwten");
+  });
+
+  it("bewaart een koppeling ook als het product zelf (nog) ontbreekt", async () => {
+    const store = freshStore();
+    await store.putProductsAndMatches([], [{ ingredientName: "kikkererwten", webshopId: "wi-7", score: 1 }]);
+
+    expect(await store.matchMap(["kikkererwten"])).toEqual({ kikkererwten: "wi-7" });
+    expect(await store.getProduct("wi-7")).toBeNull();
+  });
+
+  it("schrijft een lange reeks producten met een paar statements, laatste wint", async () => {
+    const store = freshStore();
+    let statements = 0;
+    const batch = db!.batch.bind(db!);
+    db!.batch = async (list) => {
+      statements += list.length;
+      return await batch(list);
+    };
+    const products = Array.from({ length: 40 }, (_, i) => ({
+      webshopId: `wi-${i}`,
+      title: `Product ${i}`,
+      salesUnitSize: null,
+      per100g: { kcal: i },
+    }));
+    await store.putProducts([...products, { ...products[3]!, title: "Nieuw" }]);
+
+    expect(statements).toBeLessThan(5);
+    expect(await store.productMap(["wi-3", "wi-39"])).toEqual({
+      "wi-3": { title: "Nieuw", salesUnitSize: null },
+      "wi-39": { title: "Product 39", salesUnitSize: null },
+    });
+  });
+
+  it("legt een handmatige correctie vast met het product erbij", async () => {
+    const store = freshStore();
+    await store.putMatch("kwark", "wi-9", 0.4);
+    await store.overrideMatch("kwark", {
+      webshopId: "wi-1",
+      title: "AH Magere kwark",
+      salesUnitSize: "500 g",
+      per100g: { kcal: 57 },
+    });
+
+    expect((await store.getProduct("wi-1"))?.title).toBe("AH Magere kwark");
+    expect(await store.getMatch("kwark")).toEqual({ webshopId: "wi-1", score: 1 });
+  });
 });
 
 describe("productMatchesFor", () => {
@@ -416,6 +637,20 @@ describe("productMatchesFor", () => {
   });
 });
 
+describe("app_state", () => {
+  it("leest meerdere sleutels in één keer en laat ontbrekende weg", async () => {
+    const store = freshStore();
+    await store.setState("auto:paused", "1");
+    await store.setState("auto:cursor", "7");
+
+    expect(await store.getStates(["auto:paused", "auto:cursor", "auto:nooit"])).toEqual({
+      "auto:paused": "1",
+      "auto:cursor": "7",
+    });
+    expect(await store.getStates([])).toEqual({});
+  });
+});
+
 describe("applicatielog", () => {
   it("bewaart regels met niveau, herkomst en details, nieuwste eerst", async () => {
     const store = freshStore();
@@ -556,4 +791,31 @@ describe("grote IN-lijsten (D1-limiet van 100 variabelen)", () => {
     expect(await store.countRecipes()).toBe(0);
     expect(queryCount() - before).toBeGreaterThan(1);
   });
+
+  it("knownRecipeIds bindt de lijst twee keer en splitst dus in halve stukken", async () => {
+    const { store, queryCount } = await storeMetTeller();
+    const ids = Array.from({ length: 120 }, (_, i) => "R-R" + i);
+    await store.putRecipe(recipe({ id: "R-R0" }));
+    await store.skipRecipe("R-R119", "geen voedingswaarde op de receptpagina");
+
+    const before = queryCount();
+    const known = await store.knownRecipeIds(ids);
+
+    expect([...known].sort()).toEqual(["R-R0", "R-R119"]);
+    // 120 ids × 2 = 240 parameters: met stukken van 45 zijn dat drie queries.
+    expect(queryCount() - before).toBe(3);
+  });
+
+  it("putExclusions zet een lange lijst in een paar INSERTs met meerdere rijen", async () => {
+    const { store, queryCount } = await storeMetTeller();
+    const terms = Array.from({ length: 120 }, (_, i) => "term-" + i);
+
+    const before = queryCount();
+    const stored = await store.putExclusions(terms);
+    // Eén DELETE plus 240 parameters in stukken van 45 rijen: drie INSERTs.
+    expect(queryCount() - before).toBe(4);
+
+    expect(stored).toHaveLength(120);
+    expect(await store.getExclusions()).toHaveLength(120);
+  });
 });
@@ -1,5 +1,6 @@
 import { afterEach, describe, expect, it, vi } from "vitest";
 import { AhClient, SubrequestBudgetError, type RawScrape, resetEndpointState } from "../src/ah/client";
+import { backOff, resetPace, retryAfterMs, sharedPace } from "../src/ah/pace";
 
 /**
  * ah.nl staat achter Akamai's botbescherming. Uit het scrape-archief van de
@@ -112,3 +113,94 @@ describe("verzoekbudget", () => {
     expect(fetchMock).toHaveBeenCalledTimes(2);
   });
 });
+
+describe("anoniem token", () => {
+  it("vraagt het token één keer aan per isolate, niet per client", async () => {
+    resetEndpointState();
+    const fetchMock = vi.fn(async (input: RequestInfo | URL) =>
+      String(input).includes("/mobile-auth/")
+        ? new Response(JSON.stringify({ access_token: "t" }), { status: 200 })
+        : new Response(JSON.stringify({ products: [] }), { status: 200 }),
+    );
+    vi.stubGlobal("fetch", fetchMock);
+
+    await fastClient().searchProducts("kwark");
+    await fastClient().searchProducts("havermout");
+
+    const auth = fetchMock.mock.calls.filter(([url]) => String(url).includes("/mobile-auth/"));
+    expect(auth).toHaveLength(1);
+    resetEndpointState();
+  });
+
+  it("ruimt de body van een geweigerd token op voordat het opnieuw vraagt", async () => {
+    resetEndpointState();
+    const unauthorized = new Response("expired", { status: 401 });
+    let searches = 0;
+    vi.stubGlobal(
+      "fetch",
+      vi.fn(async (input: RequestInfo | URL) => {
+        if (String(input).includes("/mobile-auth/")) {
+          return new Response(JSON.stringify({ access_token: "t" }), { status: 200 });
+        }
+        return searches++ === 0 ? unauthorized : new Response(JSON.stringify({ products: [] }), { status: 200 });
+      }),
+    );
+
+    await fastClient().searchProducts("kwark");
+
+    expect(searches).toBe(2);
+    expect(unauthorized.bodyUsed).toBe(true);
+    resetEndpointState();
+  });
+});
+
+describe("het gedeelde tempo", () => {
+  it("laat twee gelijktijdige aanroepen na elkaar gaan, niet samen", async () => {
+    resetPace();
+    await sharedPace(40);
+    const times: number[] = [];
+    await Promise.all([
+      sharedPace(40).then(() => times.push(Date.now())),
+      sharedPace(40).then(() => times.push(Date.now())),
+    ]);
+
+    expect(times[1]! - times[0]!).toBeGreaterThanOrEqual(35);
+    resetPace();
+  });
+
+  it("laat een andere client wachten terwijl één client terugtrekt", async () => {
+    resetPace();
+    const started = Date.now();
+    const pause = backOff(new Response(null, { status: 429 }), 40, 0);
+    await sharedPace(0);
+
+    expect(Date.now() - started).toBeGreaterThanOrEqual(35);
+    await pause;
+    resetPace();
+  });
+
+  it("wacht na terugtrekken niet nog een hele tussenpoos extra", async () => {
+    resetPace();
+    const started = Date.now();
+    await backOff(new Response(null, { status: 429 }), 60, 200);
+    await sharedPace(200);
+
+    // De pauze zelf, niet de pauze plus 200 ms.
+    const elapsed = Date.now() - started;
+    expect(elapsed).toBeGreaterThanOrEqual(55);
+    expect(elapsed).toBeLessThan(200);
+    resetPace();
+  });
+});
+
+describe("Retry-After", () => {
+  it("leest seconden en een HTTP-datum, en begrenst wat te lang is", () => {
+    const now = Date.parse("2026-03-01T12:00:00Z");
+    expect(retryAfterMs("3", now)).toBe(3000);
+    expect(retryAfterMs("Sun, 01 Mar 2026 12:00:05 GMT", now)).toBe(5000);
+    expect(retryAfterMs("Sun, 01 Mar 2026 11:59:00 GMT", now)).toBe(0);
+    expect(retryAfterMs("3600", now)).toBe(5_000);
+    expect(retryAfterMs("morgen", now)).toBe(0);
+    expect(retryAfterMs(null, now)).toBe(0);
+  });
+});